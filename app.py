@@ -1,26 +1,19 @@
 import streamlit as st
-import firebase_admin
-from firebase_admin import credentials, firestore
-from google.cloud.firestore_v1.base_query import FieldFilter
-
-import pandas as pd
-import plotly.express as px
 import datetime
 import time
 import json
 import hashlib
+import hmac
+import base64
+import secrets
+import threading
 import re
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from email.header import Header
-
-import google.generativeai as genai
-from duckduckgo_search import DDGS
-
-import feedparser
-import trafilatura
+# Arranque en frío: solo stdlib + streamlit a nivel de módulo.
+# firebase_admin, genai, DDGS, feedparser, trafilatura, pandas, plotly y smtplib
+# se importan dentro de la función que los usa (ver bench_startup.py).
 
 # =========================================================
 # 0) HELPERS DE SECRETS (no hardcode)
@@ -34,14 +27,19 @@ def secret_get(key: str, default=None):
 # =========================================================
 # 1) CONFIGURACIÓN Y ESTILOS (UI/UX)
 # =========================================================
-st.set_page_config(
-    page_title="AMC Intelligence Hub",
-    page_icon="🔓",
-    layout="wide",
-    initial_sidebar_state="expanded"
-)
-
-st.markdown("""
+def configurar_pagina():
+    """
+    Config de página + CSS. Se llama desde el entrypoint (no al importar el módulo).
+    """
+    st.set_page_config(
+        page_title="AMC Intelligence Hub",
+        page_icon="🔓",
+        layout="wide",
+        initial_sidebar_state="expanded"
+    )
+    st.markdown(CSS_APP, unsafe_allow_html=True)
+
+CSS_APP = """
 <style>
     div.stButton > button {
         background-color: #0d1117;
@@ -84,7 +82,7 @@ st.markdown("""
         font-size: 0.8rem; border: 1px solid #30363d; display: inline-block; font-weight: bold;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
 
 # =========================================================
 # 2) CONFIG MVP (MEJOR DE AMBOS: Web + RSS + IA + Depts)
@@ -96,6 +94,27 @@ MAX_IA_CALLS_PER_RUN = 40             # límite total IA (control costo)
 MIN_TEXT_CHARS = 800                  # si no hay texto suficiente, se descarta
 SLEEP_BETWEEN_CALLS = 0.35            # suaviza rate
 
+# Feed
+FEED_MAX_DOCS = 50                    # docs por query del dashboard
+FEED_PAGE_SIZE = 10                   # tarjetas renderizadas por página
+FEED_CACHE_TTL = 60                   # s que se reutiliza el resultado de la query
+RETENTION_DAYS = 30                   # retention.py compacta/exporta/borra lo más viejo
+
+# Extracción adaptativa (skip / fast / full por dominio)
+EXTRACTION_MIN_SAMPLES = 4            # intentos antes de confiar en la estadística de un dominio
+EXTRACTION_MIN_SUCCESS = 0.5          # tasa mínima para seguir usando un método
+FAST_FETCH_TIMEOUT = 8                # s, extractor liviano (requests + bs4)
+FAST_FETCH_MAX_BYTES = 2 * 1024 * 1024  # tope de bytes leídos por página (PDFs, binarios)
+
+# Archivo local de artículos (article_archive.py); secret ARCHIVE_DIR lo sobreescribe
+ARCHIVE_DIR = "archive"
+
+# Sesión / auth
+PASSWORD_KDF_ITERATIONS = 600_000     # PBKDF2-SHA256; ajustable con secret PASSWORD_KDF_ITERATIONS
+SESSION_TTL_SECONDS = 7 * 24 * 3600   # vida del token firmado (cookie SESSION_COOKIE)
+SESSION_COOKIE = "amc_session"
+PROFILE_CACHE_TTL = 600               # perfil de usuario en memoria local (s)
+
 LISTA_DEPARTAMENTOS = [
     "Finanzas y ROI",
     "FoodTech and Supply Chain",
@@ -121,6 +140,20 @@ QUERIES_DEPT = {
     "Legal & Regulatory Affairs / Innovation": "ley etiquetado alimentos normativa tecnología"
 }
 
+# Variantes por query de dept: más cobertura. Con caché fría cada variante es
+# una llamada a DDG, así que las extra (2da, 3ra...) se topan con MAX_DDG_VARIANT_CALLS
+QUERY_VARIANTS = [
+    "{query} noticias recientes",
+    "{query} novedades empresas",
+    "{query} casos de uso",
+]
+
+# DDG: caché (query, region, timelimit) -> resultados, TTL según la ventana pedida
+DDG_CACHE_TTL = {"d": 3600, "w": 6 * 3600, "m": 24 * 3600, "y": 7 * 24 * 3600}
+DDG_MIN_INTERVAL = 1.0                # s entre llamadas a DDG (compartido entre sesiones)
+DDG_MAX_WORKERS = 3                   # búsquedas en paralelo
+MAX_DDG_VARIANT_CALLS = 3             # variantes extra sin caché por scan (las cacheadas no cuentan)
+
 # Fuentes RSS/Atom (lo que te recomendé: estable y replicable)
 RSS_SOURCES = [
     {"name": "TechCrunch", "url": "https://techcrunch.com/feed/"},
@@ -139,6 +172,15 @@ KEYWORDS_PREFILTER = [
     "automation", "digital transformation", "cloud"
 ]
 
+VISTA_FEED = "📰 Feed de Noticias"
+VISTA_METRICAS = "📊 Métricas"
+
+# Subir al cambiar el prompt, TOPICS_MVP o LISTA_DEPARTAMENTOS: backfill.py
+# re-analiza los artículos guardados con una versión anterior.
+PROMPT_VERSION = "v1"
+RESUMEN_ERROR_IA = "Error IA"          # placeholder cuando Gemini falla
+ACCION_SIN_API_KEY = "Configurar API Key"  # análisis de relleno sin GOOGLE_API_KEY
+
 TOPICS_MVP = [
     "LLMs & Agents", "RAG & Search", "MLOps & Observability",
     "Data Platforms", "Security & Governance", "Automation",
@@ -149,8 +191,37 @@ TOPICS_MVP = [
 # 3) UTILIDADES (hash, json, url, fecha)
 # =========================================================
 def hash_pass(password: str) -> str:
+    """
+    Hash legacy (sha256 sin sal). Solo se usa para verificar cuentas antiguas;
+    al primer login correcto se re-hashea con hash_password().
+    """
     return hashlib.sha256(str.encode(password)).hexdigest()
 
+def hash_password(password: str, iterations: int = None) -> str:
+    """
+    KDF con sal: "pbkdf2_sha256$<iteraciones>$<sal_hex>$<hash_hex>".
+    """
+    iterations = int(iterations or secret_get("PASSWORD_KDF_ITERATIONS", PASSWORD_KDF_ITERATIONS))
+    salt = secrets.token_bytes(16)
+    dk = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations)
+    return f"pbkdf2_sha256${iterations}${salt.hex()}${dk.hex()}"
+
+def verify_password(password: str, stored: str):
+    """
+    Devuelve (ok, necesita_rehash). Acepta hashes legacy sha256 y PBKDF2.
+    """
+    stored = stored or ""
+    if not stored.startswith("pbkdf2_sha256$"):
+        # en bytes: compare_digest con str no-ASCII lanza TypeError
+        return hmac.compare_digest(stored.encode("utf-8"), hash_pass(password).encode("utf-8")), True
+    try:
+        _, iterations, salt_hex, dk_hex = stored.split("$")
+        dk = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), bytes.fromhex(salt_hex), int(iterations))
+    except (ValueError, TypeError):
+        return False, False
+    target = int(secret_get("PASSWORD_KDF_ITERATIONS", PASSWORD_KDF_ITERATIONS))
+    return hmac.compare_digest(dk.hex(), dk_hex), int(iterations) < target
+
 def sha1(s: str) -> str:
     return hashlib.sha1(s.encode("utf-8", errors="ignore")).hexdigest()
 
@@ -174,6 +245,59 @@ def keyword_prefilter(text: str) -> bool:
     t = (text or "").lower()
     return any(k.lower() in t for k in KEYWORDS_PREFILTER)
 
+class TTLCache:
+    """
+    Dict en memoria con expiración por entrada. Thread-safe (las sesiones de
+    Streamlit comparten proceso, cada una en su propio hilo).
+    """
+    def __init__(self, ttl: float, max_items: int = 1024):
+        self.ttl = ttl
+        self.max_items = max_items
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires_at, value = item
+            if expires_at < time.time():
+                del self._data[key]
+                return default
+            return value
+
+    def set(self, key, value, ttl: float = None):
+        with self._lock:
+            if len(self._data) >= self.max_items and key not in self._data:
+                # descarta la entrada que expira antes
+                oldest = min(self._data, key=lambda k: self._data[k][0])
+                del self._data[oldest]
+            self._data[key] = (time.time() + (self.ttl if ttl is None else ttl), value)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            item = self._data.pop(key, None)
+            return default if item is None else item[1]
+
+class RateLimiter:
+    """
+    Espaciado mínimo entre llamadas, compartido entre hilos: cada llamada reserva
+    el siguiente slot libre y duerme hasta su turno.
+    """
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.min_interval
+        if slot > now:
+            time.sleep(slot - now)
+
 def safe_time_str(ts) -> str:
     if ts is None:
         return "--:--"
@@ -191,7 +315,14 @@ def safe_time_str(ts) -> str:
 # =========================================================
 @st.cache_resource
 def init_connection():
+    """
+    Conexión Firestore perezosa: se crea la primera vez que alguien la necesita
+    (submit del login o dashboard), no antes de pintar la pantalla de acceso.
+    """
     try:
+        import firebase_admin
+        from firebase_admin import credentials, firestore
+
         if not firebase_admin._apps:
             if "FIREBASE_KEY" in st.secrets:
                 key_dict = dict(st.secrets["FIREBASE_KEY"])
@@ -207,16 +338,15 @@ def init_connection():
         st.error(f"❌ Error DB: {e}")
         return None
 
-db = init_connection()
-
 # =========================================================
 # 5) GEMINI (usa tu lib actual google-generativeai)
 # =========================================================
-if "GOOGLE_API_KEY" in st.secrets:
-    genai.configure(api_key=st.secrets["GOOGLE_API_KEY"])
-
 @st.cache_resource
 def get_gemini_model():
+    # import + configure diferidos hasta el primer análisis
+    import google.generativeai as genai
+
+    genai.configure(api_key=st.secrets["GOOGLE_API_KEY"])
     # puedes cambiar a gemini-1.5-flash / gemini-2.0-flash si lo tienes
     return genai.GenerativeModel("gemini-1.5-flash")
 
@@ -231,7 +361,7 @@ def analizar_con_gemini(texto: str, titulo: str, dept_context: str):
         return {
             "titulo_mejorado": titulo,
             "resumen": (texto or "")[:200],
-            "accion": "Configurar API Key",
+            "accion": ACCION_SIN_API_KEY,
             "score": 50,
             "departamento": dept_context,
             "topics": [],
@@ -287,7 +417,7 @@ TEXTO:
 
     return {
         "titulo_mejorado": titulo,
-        "resumen": "Error IA",
+        "resumen": RESUMEN_ERROR_IA,
         "accion": "Revisar",
         "score": 50,
         "departamento": dept_context if dept_context in LISTA_DEPARTAMENTOS else LISTA_DEPARTAMENTOS[0],
@@ -295,18 +425,222 @@ TEXTO:
         "confidence": 0.3
     }
 
-def extraer_texto_url(url: str) -> str:
+def es_analisis_ia(analisis: dict) -> bool:
+    """
+    False para el relleno sin API key y el placeholder de error: no son salida de Gemini.
     """
-    Extrae texto real del artículo (RSS/DDG) usando trafilatura.
+    return (analisis.get("resumen") != RESUMEN_ERROR_IA
+            and analisis.get("accion") != ACCION_SIN_API_KEY)
+
+def score_relevancia(valor) -> int:
+    """
+    Score 0-100 de la respuesta de Gemini; 50 si no es numérico (p.ej. "alta").
+    """
+    try:
+        return max(0, min(100, int(float(valor))))
+    except (TypeError, ValueError, OverflowError):
+        return 50
+
+def construir_analysis_doc(analisis: dict, dept_context: str) -> dict:
+    """
+    Campo `analysis` de news_articles a partir de la respuesta de analizar_con_gemini.
+    Compartido por el scan y el backfill (backfill.py). `prompt_version` solo se
+    marca en análisis reales, así backfill.py --stale-prompt re-analiza el resto.
+    """
+    doc = {
+        "departamento": analisis.get("departamento", dept_context),
+        "resumen_ejecutivo": analisis.get("resumen", ""),
+        "accion_sugerida": analisis.get("accion", ""),
+        "relevancia_score": score_relevancia(analisis.get("score", 50)),
+        "topics": analisis.get("topics", []),
+        "confidence": analisis.get("confidence", 0.5),
+    }
+    if es_analisis_ia(analisis):
+        doc["prompt_version"] = PROMPT_VERSION
+    return doc
+
+def extraer_articulo_url(url: str, html: str = ""):
+    """
+    Descarga + extracción con trafilatura. Devuelve (html, texto).
+    Si ya se tiene el HTML (p.ej. del extractor liviano) no se vuelve a descargar.
     """
     try:
-        downloaded = trafilatura.fetch_url(url, timeout=20)
+        import trafilatura
+
+        downloaded = html or trafilatura.fetch_url(url, timeout=20)
         if not downloaded:
-            return ""
+            return "", ""
         text = trafilatura.extract(downloaded, include_tables=False, include_comments=False) or ""
-        return text.strip()
+        return downloaded, text.strip()
     except Exception:
-        return ""
+        return "", ""
+
+def html_a_texto(html: str) -> str:
+    if not html or "<" not in html:
+        return (html or "").strip()
+    from bs4 import BeautifulSoup
+
+    return re.sub(r"\s+", " ", BeautifulSoup(html, "html.parser").get_text(" ")).strip()
+
+def extraer_texto_rapido(url: str):
+    """
+    Extractor liviano: GET + párrafos <p> con BeautifulSoup (sin boilerplate removal).
+    Devuelve (html, texto). Streaming: los headers se revisan antes de bajar el
+    cuerpo y se leen como mucho FAST_FETCH_MAX_BYTES.
+    """
+    try:
+        import requests
+        from bs4 import BeautifulSoup
+
+        resp = requests.get(url, timeout=FAST_FETCH_TIMEOUT, headers={"User-Agent": "Mozilla/5.0 AMC-Hub"},
+                            stream=True)
+        try:
+            if resp.status_code != 200 or "html" not in resp.headers.get("Content-Type", "html"):
+                return "", ""
+            if int(resp.headers.get("Content-Length") or 0) > FAST_FETCH_MAX_BYTES:
+                return "", ""
+            raw = bytearray()
+            for chunk in resp.iter_content(chunk_size=64 * 1024):
+                raw += chunk
+                if len(raw) >= FAST_FETCH_MAX_BYTES:
+                    del raw[FAST_FETCH_MAX_BYTES:]
+                    break
+        finally:
+            resp.close()
+        html = raw.decode(resp.encoding or "utf-8", errors="replace")
+        soup = BeautifulSoup(html, "html.parser")
+        parrafos = [p.get_text(" ", strip=True) for p in soup.find_all("p")]
+        return html, "\n".join(p for p in parrafos if len(p) > 40).strip()
+    except Exception:
+        return "", ""
+
+def dominio(url: str) -> str:
+    host = urlparse(url or "").netloc.lower()
+    return host[4:] if host.startswith("www.") else host
+
+class ExtractionStats:
+    """
+    Estadística por dominio y método ("fast" / "full"): intentos, éxitos
+    (texto >= MIN_TEXT_CHARS) y caracteres extraídos.
+    Con `store` (el ArticleArchive) se carga al iniciar y se persiste en cada
+    registro, así sobrevive a los reinicios del contenedor.
+    """
+    def __init__(self, store=None):
+        self._store = store
+        self._data = {}
+        self._lock = threading.Lock()
+        if store is not None:
+            try:
+                self._data = store.load_extraction_stats()
+            except Exception:
+                pass
+
+    def record(self, domain: str, method: str, chars: int):
+        success = chars >= MIN_TEXT_CHARS
+        with self._lock:
+            attempts, successes, total_chars = self._data.get((domain, method), (0, 0, 0))
+            self._data[(domain, method)] = (
+                attempts + 1,
+                successes + (1 if success else 0),
+                total_chars + chars,
+            )
+        if self._store is not None:
+            try:
+                self._store.record_extraction(domain, method, success, chars)
+            except Exception:
+                pass
+
+    def get(self, domain: str, method: str):
+        """
+        (intentos, tasa_éxito, chars_promedio)
+        """
+        with self._lock:
+            attempts, successes, total_chars = self._data.get((domain, method), (0, 0, 0))
+        if not attempts:
+            return 0, 0.0, 0
+        return attempts, successes / attempts, total_chars // attempts
+
+@st.cache_resource
+def get_extraction_stats():
+    return ExtractionStats(store=get_article_archive())
+
+def _full_no_aporta(stats: ExtractionStats, domain: str, texto_feed: str) -> bool:
+    # trafilatura falla seguido en el dominio y no rinde más que lo que ya trae el feed
+    full_n, full_rate, full_yield = stats.get(domain, "full")
+    return full_n >= EXTRACTION_MIN_SAMPLES and full_rate < EXTRACTION_MIN_SUCCESS and full_yield <= len(texto_feed)
+
+def planificar_extraccion(url: str, texto_feed: str, stats: ExtractionStats) -> str:
+    """
+    Decide cómo obtener el texto de un item:
+    - "skip": el feed ya trae texto suficiente, o el fetch en este dominio no suele aportar
+    - "fast": el extractor liviano funciona en este dominio (o aún se está probando)
+    - "full": trafilatura
+    """
+    if len(texto_feed) >= MIN_TEXT_CHARS:
+        return "skip"
+
+    domain = dominio(url)
+    fast_n, fast_rate, _ = stats.get(domain, "fast")
+
+    if fast_n < EXTRACTION_MIN_SAMPLES or fast_rate >= EXTRACTION_MIN_SUCCESS:
+        return "fast"
+    if _full_no_aporta(stats, domain, texto_feed):
+        return "skip"
+    return "full"
+
+def obtener_texto_articulo(url: str, body_hint: str = "", feed_content: str = ""):
+    """
+    Ejecuta el plan de extracción con fallback fast -> full y alimenta la estadística.
+    Devuelve (texto, metodo, html) con metodo en {"feed", "fast", "full"};
+    html es el crudo descargado ("" si no hubo fetch).
+    """
+    stats = get_extraction_stats()
+    texto_feed = max(html_a_texto(feed_content), html_a_texto(body_hint), key=len)
+    plan = planificar_extraccion(url, texto_feed, stats)
+    domain = dominio(url)
+
+    if plan == "skip":
+        return texto_feed, "feed", ""
+
+    html = ""
+    if plan == "fast":
+        html, text = extraer_texto_rapido(url)
+        stats.record(domain, "fast", len(text))
+        if len(text) >= MIN_TEXT_CHARS:
+            return text, "fast", html
+        # si full ya demostró que no aporta en este dominio, no se paga el segundo fetch
+        if _full_no_aporta(stats, domain, texto_feed):
+            return max(text, texto_feed, key=len), "feed", html
+
+    # trafilatura sobre el HTML ya descargado; solo se vuelve a bajar si no hay
+    html, text = extraer_articulo_url(url, html=html)
+    stats.record(domain, "full", len(text))
+    if len(text) >= MIN_TEXT_CHARS:
+        return text, "full", html
+    return texto_feed, "feed", html
+
+@st.cache_resource
+def get_article_archive():
+    """
+    Archivo local de HTML + texto (article_archive.py). None si no se puede abrir:
+    el pipeline sigue funcionando sin archivar.
+    """
+    try:
+        from article_archive import ArticleArchive
+
+        return ArticleArchive(secret_get("ARCHIVE_DIR", ARCHIVE_DIR))
+    except Exception:
+        return None
+
+def archivar_articulo(doc_id: str, *, url: str, title: str, source: str, text: str, html: str, metodo: str):
+    archive = get_article_archive()
+    if archive is None:
+        return
+    try:
+        archive.put(doc_id, url=url, text=text, html=html,
+                    meta={"title": title, "source": source, "extraction_method": metodo})
+    except Exception:
+        pass
 
 def existe_por_url(db, url: str) -> bool:
     """
@@ -316,9 +650,11 @@ def existe_por_url(db, url: str) -> bool:
     doc = db.collection("news_articles").document(doc_id).get()
     return doc.exists
 
-def guardar_noticia(db, *, title: str, url: str, source: str, dept_context: str, body_hint: str):
+def guardar_noticia(db, *, title: str, url: str, source: str, dept_context: str, body_hint: str,
+                    feed_content: str = ""):
     """
     Analiza con Gemini y guarda en news_articles usando doc_id determinístico.
+    feed_content: contenido completo del feed (content:encoded) si lo trae.
     """
     url = normalize_url(url)
     doc_id = sha1(url)
@@ -326,109 +662,168 @@ def guardar_noticia(db, *, title: str, url: str, source: str, dept_context: str,
     if db.collection("news_articles").document(doc_id).get().exists:
         return False  # ya existe
 
-    # intenta extraer texto real
-    full_text = extraer_texto_url(url)
-    texto_para_ia = full_text if len(full_text) >= MIN_TEXT_CHARS else (body_hint or "")
+    # texto real: del feed si alcanza, si no extractor liviano o trafilatura según el dominio
+    texto_para_ia, metodo, html = obtener_texto_articulo(url, body_hint=body_hint, feed_content=feed_content)
 
     if len(texto_para_ia or "") < 200:
         # no hay material suficiente ni para IA
         return False
 
+    # texto completo + HTML al archivo local (el prompt solo usa los primeros 1200 chars)
+    archivar_articulo(doc_id, url=url, title=title, source=source, text=texto_para_ia, html=html, metodo=metodo)
+
     analisis = analizar_con_gemini(texto_para_ia, title, dept_context)
-    final_title = analisis.get("titulo_mejorado", title)
-    final_dept = analisis.get("departamento", dept_context)
-    final_score = int(analisis.get("score", 50) or 50)
 
     payload = {
-        "title": final_title,
+        "title": analisis.get("titulo_mejorado", title),
         "url": url,
         "published_at": datetime.datetime.now(),
         "source": source,
-        "analysis": {
-            "departamento": final_dept,
-            "resumen_ejecutivo": analisis.get("resumen", ""),
-            "accion_sugerida": analisis.get("accion", ""),
-            "relevancia_score": final_score,
-            "topics": analisis.get("topics", []),
-            "confidence": analisis.get("confidence", 0.5),
-        }
+        "analysis": construir_analysis_doc(analisis, dept_context),
+        "extraction_method": metodo,
     }
 
     db.collection("news_articles").document(doc_id).set(payload, merge=True)
     time.sleep(SLEEP_BETWEEN_CALLS)
     return True
 
+@st.cache_resource
+def get_ddg_cache():
+    return TTLCache(ttl=DDG_CACHE_TTL["d"], max_items=512)
+
+@st.cache_resource
+def get_ddg_rate_limiter():
+    return RateLimiter(DDG_MIN_INTERVAL)
+
+def ddg_cache_key(query: str, region: str = "wt-wt", timelimit: str = "d", max_results: int = MAX_RESULTS_PER_DEPT_WEB):
+    return (query, region, timelimit, max_results)
+
+def buscar_ddg(query: str, region: str = "wt-wt", timelimit: str = "d", max_results: int = MAX_RESULTS_PER_DEPT_WEB,
+               cache: TTLCache = None, limiter: RateLimiter = None):
+    """
+    ddgs.text con caché TTL y rate limit compartido. Los errores no se cachean.
+    Desde hilos de trabajo, pasar cache/limiter resueltos en el hilo del script.
+    """
+    key = ddg_cache_key(query, region, timelimit, max_results)
+    cache = get_ddg_cache() if cache is None else cache
+    limiter = get_ddg_rate_limiter() if limiter is None else limiter
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    from duckduckgo_search import DDGS
+
+    limiter.wait()
+    resultados = list(DDGS().text(query, region=region, timelimit=timelimit, max_results=max_results))
+    cache.set(key, resultados, ttl=DDG_CACHE_TTL.get(timelimit, DDG_CACHE_TTL["d"]))
+    return resultados
+
+def planificar_busquedas(deptos, max_results: int = MAX_RESULTS_PER_DEPT_WEB, cache: TTLCache = None,
+                         max_variant_calls: int = MAX_DDG_VARIANT_CALLS):
+    """
+    Expande cada dept en sus variantes de query: [(dept, query), ...].
+    La primera variante de cada dept siempre entra; las siguientes, por rondas,
+    solo si ya están en caché o queda presupuesto de llamadas (max_variant_calls).
+    """
+    cache = get_ddg_cache() if cache is None else cache
+    queries = [(dept, QUERIES_DEPT[dept]) for dept in deptos if QUERIES_DEPT.get(dept)]
+    plan = [(dept, QUERY_VARIANTS[0].format(query=query)) for dept, query in queries]
+    restantes = max_variant_calls
+    for variant in QUERY_VARIANTS[1:]:
+        for dept, query in queries:
+            q = variant.format(query=query)
+            if cache.get(ddg_cache_key(q, max_results=max_results)) is not None:
+                plan.append((dept, q))
+            elif restantes > 0:
+                plan.append((dept, q))
+                restantes -= 1
+    return plan
+
 def scan_web_abierta(db, mis_intereses, max_results_per_dept=MAX_RESULTS_PER_DEPT_WEB):
     """
     Escaneo por DDG (tu lógica), pero mejorada:
-    - dedup por url hash
+    - variantes de query por dept, buscadas en paralelo con caché + rate limit
+      (variantes extra sin caché topadas por MAX_DDG_VARIANT_CALLS)
+    - dedup por url entre depts antes de extraer
+    - max_results_per_dept: links nuevos por dept, sumando todas sus variantes
     - intenta extraer texto real del link
     """
-    ddgs = DDGS()
     count_news = 0
 
     # si el usuario filtró intereses, escanea solo esos
     deptos_a_escanear = [d for d in QUERIES_DEPT.keys() if (not mis_intereses or d in mis_intereses)]
+    cache, limiter = get_ddg_cache(), get_ddg_rate_limiter()
+    plan = planificar_busquedas(deptos_a_escanear, max_results=max_results_per_dept, cache=cache)
 
     progress_text = "🕵️ Iniciando escaneo (Web Abierta)..."
     my_bar = st.progress(0, text=progress_text)
-    total_steps = max(1, len(deptos_a_escanear))
-    current_step = 0
+    total_steps = max(1, len(plan))
+
+    # 1) búsquedas (en hilos: sin llamadas st.* dentro)
+    resultados_por_query = {}
+    with ThreadPoolExecutor(max_workers=DDG_MAX_WORKERS) as pool:
+        futures = {
+            pool.submit(buscar_ddg, query, max_results=max_results_per_dept, cache=cache, limiter=limiter): (dept, query)
+            for dept, query in plan
+        }
+        for current_step, fut in enumerate(as_completed(futures), start=1):
+            dept, query = futures[fut]
+            my_bar.progress(int((current_step / total_steps) * 50), text=f"Web Abierta: {dept}")
+            try:
+                resultados_por_query[(dept, query)] = fut.result()
+            except Exception:
+                resultados_por_query[(dept, query)] = []
+
+    # 2) dedup entre depts (gana el primero según el plan)
+    candidatos, vistos = [], set()
+    for dept, query in plan:
+        for r in resultados_por_query.get((dept, query), []):
+            link = normalize_url(r.get("href") or "")
+            if not r.get("title") or not link or link in vistos:
+                continue
+            vistos.add(link)
+            candidatos.append((dept, r))
 
+    # 3) extracción + IA
     calls = 0
-
-    for dept in deptos_a_escanear:
-        current_step += 1
-        my_bar.progress(int((current_step / total_steps) * 100), text=f"Web Abierta: {dept}")
-
-        query = QUERIES_DEPT.get(dept, "")
-        if not query:
+    nuevos_por_dept = {}
+    total_candidatos = max(1, len(candidatos))
+    for i, (dept, r) in enumerate(candidatos, start=1):
+        if calls >= MAX_IA_CALLS_PER_RUN:
+            break
+        if nuevos_por_dept.get(dept, 0) >= max_results_per_dept:
             continue
+        my_bar.progress(50 + int((i / total_candidatos) * 50), text=f"Web Abierta: {dept}")
 
-        try:
-            resultados = list(ddgs.text(
-                f"{query} noticias recientes",
-                region="wt-wt",
-                timelimit="d",
-                max_results=max_results_per_dept
-            ))
-
-            for r in resultados:
-                if calls >= MAX_IA_CALLS_PER_RUN:
-                    break
-
-                titulo = r.get("title")
-                link = r.get("href")
-                body = r.get("body") or ""
-
-                if not titulo or not link:
-                    continue
+        titulo = r.get("title")
+        link = r.get("href")
+        body = r.get("body") or ""
 
-                if existe_por_url(db, link):
-                    continue
+        try:
+            if existe_por_url(db, link):
+                continue
+            # las variantes solo reemplazan links ya guardados, no suben el tope del dept
+            nuevos_por_dept[dept] = nuevos_por_dept.get(dept, 0) + 1
 
-                # prefiltro barato
-                if not keyword_prefilter(f"{titulo} {body}"):
-                    continue
+            # prefiltro barato
+            if not keyword_prefilter(f"{titulo} {body}"):
+                continue
 
-                ok = guardar_noticia(
-                    db,
-                    title=titulo,
-                    url=link,
-                    source="Web Abierta",
-                    dept_context=dept,
-                    body_hint=body
-                )
-                if ok:
-                    count_news += 1
-                    calls += 1
+            ok = guardar_noticia(
+                db,
+                title=titulo,
+                url=link,
+                source="Web Abierta",
+                dept_context=dept,
+                body_hint=body
+            )
+            if ok:
+                count_news += 1
+                calls += 1
 
         except Exception:
             continue
 
-        if calls >= MAX_IA_CALLS_PER_RUN:
-            break
-
     my_bar.empty()
     return count_news
 
@@ -437,6 +832,8 @@ def scan_rss(db, mis_intereses):
     Escaneo RSS/Atom + extracción real del artículo.
     Department se decide por Gemini (AUTO) para que sea replicable.
     """
+    import feedparser
+
     count_news = 0
     calls = 0
 
@@ -460,6 +857,9 @@ def scan_rss(db, mis_intereses):
 
             title = (getattr(e, "title", "") or "").strip()
             summary = (getattr(e, "summary", "") or "").strip()
+            # content:encoded / atom:content (texto completo en algunos feeds)
+            contenidos = getattr(e, "content", None) or []
+            feed_content = max((c.get("value", "") for c in contenidos), key=len, default="")
 
             if not title:
                 continue
@@ -478,7 +878,8 @@ def scan_rss(db, mis_intereses):
                 url=url,
                 source=src["name"],
                 dept_context="Innovación y Tendencias",  # “seed” seguro; Gemini puede cambiarlo
-                body_hint=summary
+                body_hint=summary,
+                feed_content=feed_content
             )
             if ok:
                 count_news += 1
@@ -510,6 +911,11 @@ def enviar_reporte_email(news_list, dest):
     if not news_list:
         return False
 
+    import smtplib
+    from email.mime.text import MIMEText
+    from email.mime.multipart import MIMEMultipart
+    from email.header import Header
+
     smtp_email = secret_get("SMTP_EMAIL")
     smtp_pass = secret_get("SMTP_APP_PASSWORD")
     smtp_host = secret_get("SMTP_HOST", "smtp.gmail.com")
@@ -574,10 +980,155 @@ def enviar_reporte_email(news_list, dest):
 # =========================================================
 # 8) LOGIN / REGISTRO (tu lógica)
 # =========================================================
-if "logged_in" not in st.session_state:
+@st.cache_resource
+def get_profile_cache():
+    return TTLCache(ttl=PROFILE_CACHE_TTL)
+
+@st.cache_resource
+def get_session_key() -> bytes:
+    """
+    Clave HMAC de los tokens de sesión. Sin SESSION_SECRET en secrets se genera una
+    por proceso (los tokens dejan de valer al reiniciar el contenedor).
+    """
+    configured = secret_get("SESSION_SECRET")
+    return configured.encode("utf-8") if configured else secrets.token_bytes(32)
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+def _unb64(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+def huella_password(password_hash: str) -> str:
+    # cambia con cada rehash/cambio de contraseña: invalida los tokens anteriores
+    return hashlib.sha256((password_hash or "").encode("utf-8")).hexdigest()[:16]
+
+def emitir_token_sesion(email: str, profile: dict) -> str:
+    claims = {
+        "sub": email,
+        "exp": int(time.time()) + SESSION_TTL_SECONDS,
+        "ver": int(profile.get("session_version", 0)),
+        "pwf": huella_password(profile.get("password")),
+    }
+    payload = _b64(json.dumps(claims).encode("utf-8"))
+    sig = _b64(hmac.new(get_session_key(), payload.encode("ascii"), hashlib.sha256).digest())
+    return f"{payload}.{sig}"
+
+def validar_token_sesion(token: str):
+    """
+    Devuelve los claims del token si la firma es válida y no expiró; si no, None.
+    La vigencia frente al perfil (logout, cambio de contraseña) la verifica token_vigente().
+    """
+    try:
+        payload, sig = (token or "").split(".")
+        expected = _b64(hmac.new(get_session_key(), payload.encode("ascii"), hashlib.sha256).digest())
+        if not hmac.compare_digest(sig, expected):
+            return None
+        data = json.loads(_unb64(payload))
+        if int(data.get("exp", 0)) < time.time():
+            return None
+        return data
+    except Exception:
+        return None
+
+def token_vigente(claims: dict, profile: dict) -> bool:
+    return (
+        int(claims.get("ver", -1)) == int(profile.get("session_version", 0))
+        and hmac.compare_digest(str(claims.get("pwf", "")), huella_password(profile.get("password")))
+    )
+
+def programar_cookie_sesion(token: str = None):
+    """
+    La cookie se escribe con JS en el próximo render (aplicar_cookie_pendiente);
+    token=None la borra.
+    """
+    st.session_state["_cookie_pendiente"] = token or ""
+
+def aplicar_cookie_pendiente():
+    if "_cookie_pendiente" not in st.session_state:
+        return
+    import streamlit.components.v1 as components
+
+    token = st.session_state.pop("_cookie_pendiente")
+    max_age = SESSION_TTL_SECONDS if token else 0
+    components.html(
+        "<script>window.parent.document.cookie = "
+        f"'{SESSION_COOKIE}={token}; Max-Age={max_age}; Path=/; SameSite=Strict; Secure';</script>",
+        height=0,
+    )
+
+def get_user_profile(db, email: str, refresh: bool = False):
+    """
+    Perfil de `users/{email}` con caché local TTL. Devuelve dict o None si no existe.
+    """
+    cache = get_profile_cache()
+    if not refresh:
+        cached = cache.get(email)
+        if cached is not None:
+            return cached
+
+    doc = db.collection("users").document(email).get()
+    if not doc.exists:
+        return None
+    data = doc.to_dict()
+    cache.set(email, data)
+    return data
+
+def actualizar_perfil(db, email: str, cambios: dict):
+    """
+    Write-through: actualiza Firestore y luego la caché local y la sesión.
+    """
+    db.collection("users").document(email).update(cambios)
+    cache = get_profile_cache()
+    cached = cache.get(email)
+    if cached is not None:
+        cache.set(email, {**cached, **cambios})
+    if st.session_state.get("user_email") == email:
+        st.session_state["user_info"].update({k: v for k, v in cambios.items() if k != "password"})
+
+def iniciar_sesion(email: str, profile: dict):
+    st.session_state["logged_in"] = True
+    st.session_state["user_email"] = email
+    st.session_state["user_info"] = {k: v for k, v in profile.items() if k != "password"}
+    programar_cookie_sesion(emitir_token_sesion(email, profile))
+
+def cerrar_sesion(db):
+    """
+    Sube session_version del usuario: revoca todos sus tokens emitidos.
+    El incremento es del lado del servidor (la versión en sesión puede estar vieja
+    si otro dispositivo ya cerró sesión) y la caché se recarga con el valor guardado.
+    """
+    email = st.session_state.get("user_email")
+    if db and email:
+        from firebase_admin import firestore
+
+        db.collection("users").document(email).update({"session_version": firestore.Increment(1)})
+        get_user_profile(db, email, refresh=True)
     st.session_state["logged_in"] = False
-if "user_info" not in st.session_state:
     st.session_state["user_info"] = {}
+    programar_cookie_sesion(None)
+
+def init_session_state():
+    if "logged_in" not in st.session_state:
+        st.session_state["logged_in"] = False
+    if "user_info" not in st.session_state:
+        st.session_state["user_info"] = {}
+
+    # re-entrada: si la sesión se perdió pero la cookie firmada sigue vigente,
+    # se restaura desde la caché de perfiles (Firestore solo en cache miss)
+    # (st.context.cookies es la del handshake: tras un logout sigue trayendo el token viejo)
+    token = st.context.cookies.get(SESSION_COOKIE)
+    if (st.session_state["logged_in"] or not token or "_cookie_pendiente" in st.session_state
+            or token == st.session_state.get("_token_rechazado")):
+        return
+    claims = validar_token_sesion(token)
+    db = init_connection() if claims else None
+    profile = get_user_profile(db, claims.get("sub")) if db else None
+    if profile and token_vigente(claims, profile):
+        iniciar_sesion(claims["sub"], profile)
+    else:
+        st.session_state["_token_rechazado"] = token
+        programar_cookie_sesion(None)
 
 def main_login():
     c1, c2, c3 = st.columns([1, 2, 1])
@@ -590,15 +1141,21 @@ def main_login():
                 email = st.text_input("Usuario (Email)")
                 password = st.text_input("Contraseña", type="password")
                 if st.form_submit_button("ACCESO"):
+                    db = init_connection()
                     if not db:
                         st.stop()
-                    doc = db.collection("users").document(email).get()
-                    if doc.exists:
-                        data = doc.to_dict()
-                        if data.get("password") == hash_pass(password):
-                            st.session_state["logged_in"] = True
-                            st.session_state["user_email"] = email
-                            st.session_state["user_info"] = data
+                    # siempre contra Firestore: un reset de contraseña no espera al TTL de la caché
+                    data = get_user_profile(db, email, refresh=True)
+                    if data:
+                        with st.spinner("Verificando..."):
+                            # pbkdf2_hmac libera el GIL: las demás sesiones siguen corriendo
+                            ok, needs_rehash = verify_password(password, data.get("password"))
+                        if ok:
+                            if needs_rehash:
+                                nuevo_hash = hash_password(password)
+                                actualizar_perfil(db, email, {"password": nuevo_hash})
+                                data = {**data, "password": nuevo_hash}
+                            iniciar_sesion(email, data)
                             st.rerun()
                         else:
                             st.error("Contraseña incorrecta.")
@@ -616,22 +1173,36 @@ def main_login():
 
                 if st.form_submit_button("CREAR CUENTA"):
                     if new_email and new_name and new_pass:
-                        if not db.collection("users").document(new_email).get().exists:
-                            final_intereses = new_intereses if new_intereses else LISTA_DEPARTAMENTOS
-                            db.collection("users").document(new_email).set({
-                                "nombre": new_name,
-                                "password": hash_pass(new_pass),
-                                "intereses": final_intereses,
-                                "created_at": datetime.datetime.now()
-                            })
+                        db = init_connection()
+                        if not db:
+                            st.stop()
+                        from google.api_core.exceptions import AlreadyExists
+
+                        final_intereses = new_intereses if new_intereses else LISTA_DEPARTAMENTOS
+                        with st.spinner("Creando cuenta..."):
+                            password_hash = hash_password(new_pass)
+                        profile = {
+                            "nombre": new_name,
+                            "password": password_hash,
+                            "intereses": final_intereses,
+                            "created_at": datetime.datetime.now()
+                        }
+                        try:
+                            # create() falla si ya existe: sin get previo
+                            db.collection("users").document(new_email).create(profile)
+                            get_profile_cache().set(new_email, profile)
                             st.success("Cuenta creada. Ingresa en la pestaña 'INGRESAR'.")
-                        else:
+                        except AlreadyExists:
                             st.warning("Usuario ya existe.")
 
 # =========================================================
 # 9) DASHBOARD PRINCIPAL (tu UI, con “Escanear Maestro”)
 # =========================================================
 def main_app():
+    db = init_connection()
+    if not db:
+        st.stop()
+
     user = st.session_state["user_info"]
     if "selected_news" not in st.session_state:
         st.session_state["selected_news"] = set()
@@ -641,7 +1212,7 @@ def main_app():
         st.caption(f"👤 {user.get('nombre', 'Analista')}")
 
         if st.button("🚪 Cerrar Sesión"):
-            st.session_state["logged_in"] = False
+            cerrar_sesion(db)
             st.rerun()
 
         st.divider()
@@ -659,14 +1230,14 @@ def main_app():
             if st.button("🔄 Escanear"):
                 with st.spinner("Escaneando fuentes..."):
                     n = buscador_inteligente_maestro(db, mis_intereses, usar_web=usar_web, usar_rss=usar_rss)
+                    consultar_noticias.clear()
                     st.toast(f"Escaneo completado: {n} nuevas.", icon="✅")
                     time.sleep(1)
                     st.rerun()
 
         with c_save:
             if st.button("💾 Guardar"):
-                db.collection("users").document(st.session_state["user_email"]).update({"intereses": mis_intereses})
-                st.session_state["user_info"]["intereses"] = mis_intereses
+                actualizar_perfil(db, st.session_state["user_email"], {"intereses": mis_intereses})
                 st.toast("Preferencias guardadas")
 
         st.markdown("---")
@@ -692,6 +1263,8 @@ def main_app():
             uploaded_file = st.file_uploader("Sube tu archivo", type=["csv", "xlsx"])
             if uploaded_file:
                 try:
+                    import pandas as pd
+
                     if uploaded_file.name.endswith(".csv"):
                         df_upload = pd.read_csv(uploaded_file)
                     else:
@@ -707,14 +1280,18 @@ def main_app():
 
         st.markdown("---")
 
+        # el contador se refresca en reruns completos; los checkboxes del feed son
+        # fragments, así que el botón no se deshabilita con un valor desactualizado
         count_sel = len(st.session_state["selected_news"])
         label_email = f"🚀 Enviar ({count_sel})" if count_sel > 0 else "🚀 Enviar Selección"
 
-        if st.button(label_email, disabled=(count_sel == 0)):
-            if not lista_destinatarios:
+        if st.button(label_email):
+            if not st.session_state["selected_news"]:
+                st.warning("⚠️ No hay noticias seleccionadas.")
+            elif not lista_destinatarios:
                 st.error("⚠️ No hay destinatarios definidos.")
             elif "news_cache" in st.session_state:
-                to_send = [n for n in st.session_state["news_cache"] if n.get("title") in st.session_state["selected_news"]]
+                to_send = [n for n in st.session_state["news_cache"] if n.get("id") in st.session_state["selected_news"]]
 
                 my_bar = st.progress(0, text="Enviando reportes...")
                 exitos, fallos = 0, 0
@@ -732,7 +1309,7 @@ def main_app():
 
                 if exitos > 0:
                     st.toast(f"✅ Enviado con éxito a {exitos} destinatarios!", icon="🚀")
-                    st.session_state["selected_news"] = set()
+                    limpiar_seleccion()
                     if fallos > 0:
                         st.warning(f"Hubo {fallos} envíos fallidos.")
                     time.sleep(1)
@@ -745,12 +1322,41 @@ def main_app():
     # ===========================
     st.title("Centro de Inteligencia")
 
+    lista_noticias = consultar_noticias(db, tuple(mis_intereses), filtro_tiempo)
+    st.session_state["news_cache"] = lista_noticias
+
+    # st.tabs ejecuta el cuerpo de todas las pestañas en cada rerun; con un selector
+    # solo corre la vista activa (pandas/plotly no se importan hasta abrir Métricas).
+    vista = st.radio("Vista", [VISTA_FEED, VISTA_METRICAS], horizontal=True, label_visibility="collapsed")
+
+    if vista == VISTA_FEED:
+        render_feed(lista_noticias)
+
+    elif vista == VISTA_METRICAS:
+        render_metricas(lista_noticias)
+
+@st.cache_data(ttl=FEED_CACHE_TTL, show_spinner=False)
+def consultar_noticias(_db, mis_intereses: tuple, filtro_tiempo: str, limit: int = FEED_MAX_DOCS):
+    """
+    Query del dashboard. Cacheada FEED_CACHE_TTL s: los reruns (paginar, cambiar
+    de vista, enviar) no vuelven a leer Firestore. El scan limpia la caché.
+    """
+    return consultar_noticias_firestore(_db, mis_intereses, filtro_tiempo, limit)
+
+def consultar_noticias_firestore(db, mis_intereses, filtro_tiempo: str, limit: int = FEED_MAX_DOCS):
+    """
+    Query del dashboard sin caché (loadtest.py la usa como baseline).
+    Cada noticia incluye "id" (doc id de news_articles).
+    """
+    from firebase_admin import firestore
+    from google.cloud.firestore_v1.base_query import FieldFilter
+
     hoy = datetime.datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
     query = db.collection("news_articles")
 
     # Firestore: 'in' máximo 10 elementos; tu default usa 3 -> ok
     if mis_intereses:
-        query = query.where(filter=FieldFilter("analysis.departamento", "in", mis_intereses[:10]))
+        query = query.where(filter=FieldFilter("analysis.departamento", "in", list(mis_intereses[:10])))
 
     if filtro_tiempo == "Hoy (Tiempo Real)":
         query = query.where(filter=FieldFilter("published_at", ">=", hoy))
@@ -761,96 +1367,157 @@ def main_app():
         week = hoy - datetime.timedelta(days=7)
         query = query.where(filter=FieldFilter("published_at", ">=", week))
 
-    docs = query.order_by("published_at", direction=firestore.Query.DESCENDING).limit(50).stream()
-    lista_noticias = [d.to_dict() for d in docs]
-    st.session_state["news_cache"] = lista_noticias
+    docs = query.order_by("published_at", direction=firestore.Query.DESCENDING).limit(limit).stream()
+    return [{**d.to_dict(), "id": d.id} for d in docs]
 
-    tab_news, tab_metrics = st.tabs(["📰 Feed de Noticias", "📊 Métricas"])
-
-    with tab_news:
-        if not lista_noticias:
-            st.info("📭 Sin noticias. Usa el botón '🔄 Escanear' en la barra lateral.")
-        else:
-            col_ia_1, col_ia_2 = st.columns([3, 1])
-            with col_ia_2:
-                if st.button(f"✨ Auto-selección IA (>{MIN_SCORE_IA})"):
-                    added = 0
-                    for n in lista_noticias:
-                        if n.get("analysis", {}).get("relevancia_score", 0) > MIN_SCORE_IA:
-                            st.session_state["selected_news"].add(n.get("title"))
-                            added += 1
-                    st.toast(f"IA seleccionó {added} noticias relevantes.", icon="🤖")
-                    time.sleep(0.8)
-                    st.rerun()
+def _chk_key(doc_id: str) -> str:
+    return f"chk_{doc_id}"
 
+def marcar_seleccion(doc_id: str, checked: bool):
+    """
+    Selección por doc id (no por título: títulos repetidos colisionaban).
+    Mantiene sincronizado el set y el estado del checkbox.
+    """
+    if checked:
+        st.session_state["selected_news"].add(doc_id)
+    else:
+        st.session_state["selected_news"].discard(doc_id)
+    st.session_state[_chk_key(doc_id)] = checked
+
+def limpiar_seleccion():
+    for doc_id in st.session_state["selected_news"]:
+        st.session_state.pop(_chk_key(doc_id), None)
+    st.session_state["selected_news"] = set()
+
+def _on_toggle_noticia(doc_id: str):
+    marcar_seleccion(doc_id, st.session_state[_chk_key(doc_id)])
+
+@st.fragment
+def render_tarjeta_noticia(n: dict):
+    """
+    Una tarjeta del feed. Es un fragment: marcar el checkbox reruns solo esta tarjeta.
+    """
+    doc_id = n["id"]
+    title = n.get("title", "Sin título")
+    a = n.get("analysis", {})
+    dept = a.get("departamento", "General")
+    color = COLORES_DEPT.get(dept, "#888")
+    score = a.get("relevancia_score", 0)
+    published_at = n.get("published_at")
+
+    key = _chk_key(doc_id)
+    if key not in st.session_state:
+        st.session_state[key] = doc_id in st.session_state["selected_news"]
+
+    with st.container():
+        c_chk, c_line, c_content = st.columns([0.2, 0.1, 4])
+
+        with c_chk:
+            st.checkbox("Seleccionar", key=key, label_visibility="collapsed",
+                        on_change=_on_toggle_noticia, args=(doc_id,))
+
+        with c_line:
+            st.markdown(f"<div style='height:100%; width:4px; background-color:{color}; border-radius:4px;'></div>", unsafe_allow_html=True)
+
+        with c_content:
+            st.markdown(f"### [{title}]({n.get('url', '')})")
+            st.caption(f"**{dept}** • {safe_time_str(published_at)}")
+            st.markdown(f"{a.get('resumen_ejecutivo', '...')}")
+
+            badge_color = "#00E676" if score > MIN_SCORE_IA else "#c9d1d9"
+            border_color = "#00E676" if score > MIN_SCORE_IA else "#444"
+
+            accion = a.get("accion_sugerida", "Revisar")
+            st.markdown(f"""
+            <div style="margin-top:10px; display:flex; gap:10px; flex-wrap:wrap;">
+                <span style="background:rgba(0,193,169,0.1); color:#00c1a9; padding:2px 8px; border-radius:4px; font-size:0.85em;">
+                    💡 {accion}
+                </span>
+                <span class="ia-badge" style="color:{badge_color}; border-color:{border_color};">
+                    IA Score: {score}/100
+                </span>
+            </div>
+            """, unsafe_allow_html=True)
+
+        st.divider()
+
+@st.fragment
+def render_feed(lista_noticias):
+    """
+    Feed paginado: solo se construyen las FEED_PAGE_SIZE tarjetas de la página
+    actual, así el costo por interacción no crece con el tamaño del feed.
+    """
+    if not lista_noticias:
+        st.info("📭 Sin noticias. Usa el botón '🔄 Escanear' en la barra lateral.")
+        return
+
+    total_paginas = max(1, -(-len(lista_noticias) // FEED_PAGE_SIZE))
+
+    col_ia_1, col_ia_2 = st.columns([3, 1])
+    with col_ia_1:
+        pagina = st.number_input(
+            f"Página (de {total_paginas})", min_value=1, max_value=total_paginas, value=1, step=1,
+            key="feed_page"
+        ) if total_paginas > 1 else 1
+    with col_ia_2:
+        if st.button(f"✨ Auto-selección IA (>{MIN_SCORE_IA})"):
+            added = 0
             for n in lista_noticias:
-                title = n.get("title", "Sin título")
-                a = n.get("analysis", {})
-                dept = a.get("departamento", "General")
-                color = COLORES_DEPT.get(dept, "#888")
-                score = a.get("relevancia_score", 0)
-                published_at = n.get("published_at")
+                if n.get("analysis", {}).get("relevancia_score", 0) > MIN_SCORE_IA:
+                    marcar_seleccion(n["id"], True)
+                    added += 1
+            # las tarjetas se pintan después de este botón: no hace falta rerun
+            st.toast(f"IA seleccionó {added} noticias relevantes.", icon="🤖")
+
+    inicio = (int(pagina) - 1) * FEED_PAGE_SIZE
+    for n in lista_noticias[inicio:inicio + FEED_PAGE_SIZE]:
+        render_tarjeta_noticia(n)
 
-                is_checked = title in st.session_state["selected_news"]
+def construir_df_metricas(lista_noticias):
+    """
+    DataFrame de `analysis` para los gráficos; None si no hay datos graficables.
+    """
+    if not lista_noticias:
+        return None
 
-                with st.container():
-                    c_chk, c_line, c_content = st.columns([0.2, 0.1, 4])
+    import pandas as pd
 
-                    with c_chk:
-                        if st.checkbox("", value=is_checked, key=f"chk_{sha1(title)}"):
-                            st.session_state["selected_news"].add(title)
-                        else:
-                            st.session_state["selected_news"].discard(title)
-
-                    with c_line:
-                        st.markdown(f"<div style='height:100%; width:4px; background-color:{color}; border-radius:4px;'></div>", unsafe_allow_html=True)
-
-                    with c_content:
-                        st.markdown(f"### [{title}]({n.get('url', '')})")
-                        st.caption(f"**{dept}** • {safe_time_str(published_at)}")
-                        st.markdown(f"{a.get('resumen_ejecutivo', '...')}")
-
-                        badge_color = "#00E676" if score > MIN_SCORE_IA else "#c9d1d9"
-                        border_color = "#00E676" if score > MIN_SCORE_IA else "#444"
-
-                        accion = a.get("accion_sugerida", "Revisar")
-                        st.markdown(f"""
-                        <div style="margin-top:10px; display:flex; gap:10px; flex-wrap:wrap;">
-                            <span style="background:rgba(0,193,169,0.1); color:#00c1a9; padding:2px 8px; border-radius:4px; font-size:0.85em;">
-                                💡 {accion}
-                            </span>
-                            <span class="ia-badge" style="color:{badge_color}; border-color:{border_color};">
-                                IA Score: {score}/100
-                            </span>
-                        </div>
-                        """, unsafe_allow_html=True)
-
-                    st.divider()
-
-    with tab_metrics:
-        if lista_noticias:
-            df = pd.DataFrame([n.get("analysis", {}) for n in lista_noticias if "analysis" in n])
-            if not df.empty and "departamento" in df.columns and "relevancia_score" in df.columns:
-                c1, c2 = st.columns(2)
-                with c1:
-                    st.plotly_chart(
-                        px.pie(df, names="departamento", color="departamento",
-                               color_discrete_map=COLORES_DEPT, hole=0.4),
-                        use_container_width=True
-                    )
-                with c2:
-                    st.plotly_chart(
-                        px.bar(df.groupby("departamento")["relevancia_score"].mean().reset_index(),
-                               x="departamento", y="relevancia_score", color="departamento",
-                               color_discrete_map=COLORES_DEPT),
-                        use_container_width=True
-                    )
+    df = pd.DataFrame([n.get("analysis", {}) for n in lista_noticias if "analysis" in n])
+    if df.empty or "departamento" not in df.columns or "relevancia_score" not in df.columns:
+        return None
+    return df
+
+def render_metricas(lista_noticias):
+    """
+    Gráficos del dashboard. pandas/plotly se importan aquí (solo al abrir la vista).
+    """
+    df = construir_df_metricas(lista_noticias)
+    if df is not None:
+        import plotly.express as px
+
+        c1, c2 = st.columns(2)
+        with c1:
+            st.plotly_chart(
+                px.pie(df, names="departamento", color="departamento",
+                       color_discrete_map=COLORES_DEPT, hole=0.4),
+                use_container_width=True
+            )
+        with c2:
+            st.plotly_chart(
+                px.bar(df.groupby("departamento")["relevancia_score"].mean().reset_index(),
+                       x="departamento", y="relevancia_score", color="departamento",
+                       color_discrete_map=COLORES_DEPT),
+                use_container_width=True
+            )
 
 # =========================================================
 # 10) ENTRYPOINT
 # =========================================================
 if __name__ == "__main__":
+    configurar_pagina()
+    init_session_state()
     if st.session_state["logged_in"]:
         main_app()
     else:
         main_login()
+    aplicar_cookie_pendiente()
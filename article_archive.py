@@ -0,0 +1,312 @@
+"""
+Archivo local de artículos (HTML crudo + texto extraído).
+
+- Direccionado por contenido: cada blob se guarda una vez por sha256, así las
+  copias sindicadas del mismo texto ocupan un solo blob.
+- Blobs comprimidos con zstd + diccionario entrenado sobre las primeras muestras
+  (fallback a zlib si `zstandard` no está instalado).
+- Segmentos append-only (`seg-000001.dat`, ...) + índice SQLite para acceso
+  aleatorio por doc id y lectura secuencial (re-análisis sin red).
+
+No depende de streamlit: lo usan app.py y los jobs batch (backfill, retención).
+
+Uso:
+    python article_archive.py stats [--root archive]
+"""
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # opcional: sin zstd se usa zlib
+    zstandard = None
+
+DEFAULT_ROOT = "archive"
+SEGMENT_MAX_BYTES = 64 * 1024 * 1024
+DICT_TRAIN_SAMPLES = 256              # blobs sin diccionario antes de entrenar uno
+DICT_SIZE = 112 * 1024
+ZSTD_LEVEL = 9
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    segment INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    raw_length INTEGER NOT NULL,
+    codec TEXT NOT NULL,
+    dict_id INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS articles (
+    doc_id TEXT PRIMARY KEY,
+    url TEXT,
+    text_hash TEXT,
+    html_hash TEXT,
+    archived_at REAL NOT NULL,
+    meta TEXT
+);
+CREATE TABLE IF NOT EXISTS dicts (
+    dict_id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS extraction_stats (
+    domain TEXT NOT NULL,
+    method TEXT NOT NULL,
+    attempts INTEGER NOT NULL,
+    successes INTEGER NOT NULL,
+    total_chars INTEGER NOT NULL,
+    PRIMARY KEY (domain, method)
+);
+"""
+
+
+class ArticleArchive:
+    """
+    Archivo de artículos en `root`. Thread-safe; una instancia por proceso.
+    """
+    def __init__(self, root: str = DEFAULT_ROOT, segment_max_bytes: int = SEGMENT_MAX_BYTES,
+                 dict_train_samples: int = DICT_TRAIN_SAMPLES):
+        self.root = root
+        self.segment_max_bytes = segment_max_bytes
+        self.dict_train_samples = dict_train_samples
+        self._dict_retry_at = dict_train_samples   # sube al doble tras cada entrenamiento fallido
+        self.codec = "zstd" if zstandard else "zlib"
+
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(os.path.join(root, "index.sqlite"), check_same_thread=False)
+        self._db.executescript(SCHEMA)
+        self._dicts = {}            # dict_id -> zstandard.ZstdCompressionDict
+        self._compressors = {}      # dict_id -> ZstdCompressor
+        self._decompressors = {}    # dict_id -> ZstdDecompressor
+        self._load_dicts()
+
+    # ---------- escritura ----------
+    def put(self, doc_id: str, *, url: str, text: str, html: str = "", meta: dict = None):
+        """
+        Guarda (o reemplaza) el artículo `doc_id`. Los blobs ya presentes no se reescriben.
+        """
+        with self._lock:
+            text_hash = self._put_blob(text.encode("utf-8")) if text else None
+            html_hash = self._put_blob(html.encode("utf-8")) if html else None
+            self._db.execute(
+                "INSERT OR REPLACE INTO articles (doc_id, url, text_hash, html_hash, archived_at, meta) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (doc_id, url, text_hash, html_hash, time.time(), json.dumps(meta or {}, ensure_ascii=False)),
+            )
+            self._db.commit()
+            self._maybe_train_dict()
+
+    def _put_blob(self, raw: bytes) -> str:
+        digest = hashlib.sha256(raw).hexdigest()
+        if self._db.execute("SELECT 1 FROM blobs WHERE hash = ?", (digest,)).fetchone():
+            return digest
+
+        dict_id = max(self._dicts) if self._dicts else 0
+        data = self._compress(raw, dict_id)
+        segment, offset = self._append(data)
+        self._db.execute(
+            "INSERT INTO blobs (hash, segment, offset, length, raw_length, codec, dict_id) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (digest, segment, offset, len(data), len(raw), self.codec, dict_id),
+        )
+        return digest
+
+    def _append(self, data: bytes):
+        row = self._db.execute("SELECT MAX(segment) FROM blobs").fetchone()
+        segment = row[0] or 1
+        path = self._segment_path(segment)
+        if os.path.exists(path) and os.path.getsize(path) + len(data) > self.segment_max_bytes:
+            segment += 1
+            path = self._segment_path(segment)
+        with open(path, "ab") as fh:
+            offset = fh.tell()
+            fh.write(data)
+        return segment, offset
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.root, f"seg-{segment:06d}.dat")
+
+    # ---------- lectura ----------
+    def get(self, doc_id: str, with_html: bool = True):
+        """
+        Acceso aleatorio por doc id: {"doc_id", "url", "text", "html", "archived_at", "meta"} o None.
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT doc_id, url, text_hash, html_hash, archived_at, meta FROM articles WHERE doc_id = ?",
+                (doc_id,),
+            ).fetchone()
+            return self._row_to_article(row, with_html) if row else None
+
+    def __contains__(self, doc_id: str) -> bool:
+        with self._lock:
+            return self._db.execute("SELECT 1 FROM articles WHERE doc_id = ?", (doc_id,)).fetchone() is not None
+
+    def iter_articles(self, with_html: bool = False, batch_size: int = 200):
+        """
+        Recorre el archivo en orden de archivado, leyendo el índice por páginas
+        (no carga todo en memoria). Pensado para re-análisis sin red.
+        """
+        last_rowid = 0
+        while True:
+            with self._lock:
+                rows = self._db.execute(
+                    "SELECT rowid, doc_id, url, text_hash, html_hash, archived_at, meta FROM articles "
+                    "WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                    (last_rowid, batch_size),
+                ).fetchall()
+                articles = [self._row_to_article(r[1:], with_html) for r in rows]
+            if not rows:
+                return
+            last_rowid = rows[-1][0]
+            yield from articles
+
+    def _row_to_article(self, row, with_html: bool):
+        doc_id, url, text_hash, html_hash, archived_at, meta = row
+        return {
+            "doc_id": doc_id,
+            "url": url,
+            "text": self._get_blob(text_hash) if text_hash else "",
+            "html": self._get_blob(html_hash) if (with_html and html_hash) else "",
+            "archived_at": archived_at,
+            "meta": json.loads(meta or "{}"),
+        }
+
+    def _get_blob(self, digest: str) -> str:
+        row = self._db.execute(
+            "SELECT segment, offset, length, codec, dict_id FROM blobs WHERE hash = ?", (digest,)
+        ).fetchone()
+        if not row:
+            return ""
+        segment, offset, length, codec, dict_id = row
+        with open(self._segment_path(segment), "rb") as fh:
+            fh.seek(offset)
+            data = fh.read(length)
+        return self._decompress(data, codec, dict_id).decode("utf-8")
+
+    # ---------- compresión ----------
+    def _compress(self, raw: bytes, dict_id: int) -> bytes:
+        if self.codec == "zlib":
+            return zlib.compress(raw, 6)
+        if dict_id not in self._compressors:
+            self._compressors[dict_id] = zstandard.ZstdCompressor(
+                level=ZSTD_LEVEL, dict_data=self._dicts.get(dict_id)
+            )
+        return self._compressors[dict_id].compress(raw)
+
+    def _decompress(self, data: bytes, codec: str, dict_id: int) -> bytes:
+        if codec == "zlib":
+            return zlib.decompress(data)
+        if zstandard is None:
+            raise RuntimeError("El archivo usa zstd: instalar `zstandard` para leerlo")
+        if dict_id not in self._decompressors:
+            self._decompressors[dict_id] = zstandard.ZstdDecompressor(dict_data=self._dicts.get(dict_id))
+        return self._decompressors[dict_id].decompress(data)
+
+    def _load_dicts(self):
+        if zstandard is None:
+            return
+        for dict_id, path in self._db.execute("SELECT dict_id, path FROM dicts"):
+            with open(os.path.join(self.root, path), "rb") as fh:
+                self._dicts[dict_id] = zstandard.ZstdCompressionDict(fh.read())
+
+    def _maybe_train_dict(self):
+        """
+        Entrena un diccionario cuando se acumulan `dict_train_samples` blobs
+        comprimidos sin diccionario. Los blobs viejos quedan como están
+        (cada uno recuerda su dict_id). Si el entrenamiento falla, el próximo
+        intento espera al doble de muestras (no se reintenta en cada put).
+        """
+        if self.codec != "zstd" or self._dicts:
+            return
+        rows = self._db.execute(
+            "SELECT hash FROM blobs WHERE dict_id = 0 AND codec = 'zstd' LIMIT ?", (self._dict_retry_at,)
+        ).fetchall()
+        if len(rows) < self._dict_retry_at:
+            return
+
+        samples = [self._get_blob(h).encode("utf-8") for (h,) in rows]
+        try:
+            trained = zstandard.train_dictionary(DICT_SIZE, samples)
+        except zstandard.ZstdError:
+            # muestras insuficientes/homogéneas: se reintenta con más variedad
+            self._dict_retry_at *= 2
+            return
+
+        dict_id = 1
+        path = f"dict-{dict_id:04d}.zdict"
+        with open(os.path.join(self.root, path), "wb") as fh:
+            fh.write(trained.as_bytes())
+        self._db.execute("INSERT INTO dicts (dict_id, path) VALUES (?, ?)", (dict_id, path))
+        self._db.commit()
+        self._dicts[dict_id] = trained
+
+    # ---------- estadística de extracción (app.ExtractionStats) ----------
+    def load_extraction_stats(self) -> dict:
+        """
+        {(domain, method): (attempts, successes, total_chars)}
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT domain, method, attempts, successes, total_chars FROM extraction_stats"
+            ).fetchall()
+        return {(d, m): (a, s, c) for d, m, a, s, c in rows}
+
+    def record_extraction(self, domain: str, method: str, success: bool, chars: int):
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO extraction_stats (domain, method, attempts, successes, total_chars) "
+                "VALUES (?, ?, 1, ?, ?) "
+                "ON CONFLICT (domain, method) DO UPDATE SET "
+                "attempts = attempts + 1, successes = successes + excluded.successes, "
+                "total_chars = total_chars + excluded.total_chars",
+                (domain, method, int(success), chars),
+            )
+            self._db.commit()
+
+    # ---------- utilidades ----------
+    def stats(self) -> dict:
+        with self._lock:
+            docs = self._db.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+            blobs, raw_bytes, stored_bytes = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(raw_length), 0), COALESCE(SUM(length), 0) FROM blobs"
+            ).fetchone()
+            refs = self._db.execute(
+                "SELECT COUNT(text_hash) + COUNT(html_hash) FROM articles"
+            ).fetchone()[0]
+        return {
+            "docs": docs,
+            "blobs": blobs,
+            "deduped_refs": max(0, refs - blobs),
+            "raw_bytes": raw_bytes,
+            "stored_bytes": stored_bytes,
+            "ratio": round(raw_bytes / stored_bytes, 2) if stored_bytes else 0.0,
+            "codec": self.codec,
+            "dicts": len(self._dicts),
+        }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["stats"])
+    parser.add_argument("--root", default=os.environ.get("ARCHIVE_DIR", DEFAULT_ROOT))
+    args = parser.parse_args(argv)
+
+    archive = ArticleArchive(args.root)
+    print(json.dumps(archive.stats(), indent=2))
+    archive.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+"""
+Backfill / re-análisis de `news_articles`.
+
+Recorre la colección por páginas (orden published_at) con un cursor en un
+checkpoint JSON, selecciona documentos por filtro, re-ejecuta Gemini en
+paralelo bajo un presupuesto de llamadas y escribe los resultados en batches.
+El texto sale del archivo local (article_archive.py): sin red salvo --fetch-missing.
+
+Se puede cortar en cualquier momento (Ctrl+C): el checkpoint solo avanza
+después de que el batch de la página quedó escrito, y reanudar repite como
+mucho esa página (las escrituras son idempotentes).
+
+Uso:
+    python backfill.py --stale-prompt                       # prompt_version != PROMPT_VERSION
+    python backfill.py --only-errors --since 2025-01-01     # placeholders "Error IA" / sin API key
+    python backfill.py --stale-prompt --max-calls 200 --concurrency 4
+    python backfill.py --stale-prompt --dry-run             # solo cuenta candidatos
+    python backfill.py --reset ...                          # ignora el checkpoint previo
+"""
+import argparse
+import datetime
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import app
+
+DEFAULT_CHECKPOINT = "backfill_checkpoint.json"
+FIRESTORE_BATCH_LIMIT = 500
+
+
+def parse_date(value: str) -> datetime.datetime:
+    return datetime.datetime.fromisoformat(value)
+
+
+def filter_signature(args) -> dict:
+    # el checkpoint solo se reutiliza con los mismos filtros
+    return {
+        "only_errors": args.only_errors,
+        "stale_prompt": args.stale_prompt,
+        "prompt_version": app.PROMPT_VERSION,
+        "since": args.since,
+        "until": args.until,
+    }
+
+
+def load_checkpoint(path: str, signature: dict, reset: bool) -> dict:
+    fresh = {"filters": signature, "cursor": None, "scanned": 0, "selected": 0,
+             "analyzed": 0, "written": 0, "failed": 0, "no_text": 0, "deleted": 0, "calls": 0,
+             "done": False}
+    if reset or not os.path.exists(path):
+        return fresh
+    with open(path, encoding="utf-8") as fh:
+        data = json.load(fh)
+    if data.get("filters") != signature:
+        print(f"⚠️ {path} es de otros filtros; usar --reset o --checkpoint distinto", file=sys.stderr)
+        sys.exit(2)
+    return {**fresh, **data}  # contadores agregados después del checkpoint
+
+
+def save_checkpoint(path: str, state: dict):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(state, fh, indent=2)
+    os.replace(tmp, path)  # atómico: un corte nunca deja el checkpoint a medias
+
+
+def build_query(db, args):
+    from google.cloud.firestore_v1.base_query import FieldFilter
+
+    query = db.collection("news_articles")
+    if args.since:
+        query = query.where(filter=FieldFilter("published_at", ">=", parse_date(args.since)))
+    if args.until:
+        query = query.where(filter=FieldFilter("published_at", "<", parse_date(args.until)))
+    return query.order_by("published_at")
+
+
+def is_candidate(data: dict, args) -> bool:
+    """
+    Filtros del lado cliente (no requieren índices compuestos en Firestore).
+    """
+    analysis = data.get("analysis", {}) or {}
+    if args.only_errors and app.es_analisis_ia({"resumen": analysis.get("resumen_ejecutivo"),
+                                                "accion": analysis.get("accion_sugerida")}):
+        return False
+    if args.stale_prompt and analysis.get("prompt_version") == app.PROMPT_VERSION:
+        return False
+    return True
+
+
+def iter_pages(db, args, cursor_id):
+    query = build_query(db, args)
+    if cursor_id:
+        snapshot = db.collection("news_articles").document(cursor_id).get()
+        if snapshot.exists:
+            query = query.start_after(snapshot)
+    while True:
+        page = list(query.limit(args.page_size).stream())
+        if not page:
+            return
+        yield page
+        query = build_query(db, args).start_after(page[-1])
+
+
+def load_text(archive, doc, args):
+    """
+    Texto para el re-análisis: archivo local; red solo con --fetch-missing.
+    """
+    data = doc.to_dict()
+    if archive is not None:
+        stored = archive.get(doc.id, with_html=False)
+        if stored and stored["text"]:
+            return stored["text"], stored["meta"].get("title") or data.get("title", "")
+    if args.fetch_missing and data.get("url"):
+        text, _, _ = app.obtener_texto_articulo(data["url"])
+        return text, data.get("title", "")
+    return "", data.get("title", "")
+
+
+def reanalyze(doc, text: str, title: str):
+    data = doc.to_dict()
+    dept_context = (data.get("analysis", {}) or {}).get("departamento", app.LISTA_DEPARTAMENTOS[0])
+    analisis = app.analizar_con_gemini(text, title, dept_context)
+    if not app.es_analisis_ia(analisis):
+        return doc, None  # error o relleno sin API key: cuenta como fallido, no se escribe
+    return doc, {
+        "title": analisis.get("titulo_mejorado", title),
+        "analysis": app.construir_analysis_doc(analisis, dept_context),
+        "reanalyzed_at": datetime.datetime.now(),
+    }
+
+
+def write_results(db, results) -> int:
+    """
+    Escribe en batches. Un doc borrado mientras tanto (p.ej. por retention.py)
+    hace fallar el batch entero con NotFound: ese tramo se reintenta doc por
+    doc y los borrados se saltean. Devuelve cuántos se escribieron.
+    """
+    from google.api_core.exceptions import NotFound
+
+    written = 0
+    for start in range(0, len(results), FIRESTORE_BATCH_LIMIT):
+        chunk = results[start:start + FIRESTORE_BATCH_LIMIT]
+        batch = db.batch()
+        for doc, update in chunk:
+            batch.update(doc.reference, update)
+        try:
+            batch.commit()
+            written += len(chunk)
+        except NotFound:
+            for doc, update in chunk:
+                try:
+                    doc.reference.update(update)
+                    written += 1
+                except NotFound:
+                    pass
+    return written
+
+
+def report(state: dict, started: float, baseline: dict, prefix: str = ""):
+    """
+    Totales acumulados (checkpoint) + throughput de esta corrida.
+    """
+    elapsed = max(time.monotonic() - started, 1e-6)
+    scanned = state["scanned"] - baseline["scanned"]
+    analyzed = state["analyzed"] - baseline["analyzed"]
+    print(
+        f"{prefix}leídos {state['scanned']} | seleccionados {state['selected']} | "
+        f"analizados {state['analyzed']} | escritos {state['written']} | "
+        f"fallidos {state['failed']} | sin texto {state['no_text']} | borrados {state['deleted']} | "
+        f"llamadas IA {state['calls']} | "
+        f"{scanned / elapsed:.1f} docs/s, {analyzed / elapsed:.2f} análisis/s"
+    )
+
+
+def run(args) -> int:
+    db = app.init_connection()
+    if db is None:
+        print("❌ Sin conexión a Firestore", file=sys.stderr)
+        return 1
+    if not args.dry_run and app.secret_get("GOOGLE_API_KEY") is None:
+        # sin key analizar_con_gemini devuelve un relleno: no tiene sentido gastar el recorrido
+        print("❌ GOOGLE_API_KEY no configurada: el re-análisis necesita Gemini", file=sys.stderr)
+        return 1
+    archive = app.get_article_archive()
+
+    # dry-run recorre todo desde el inicio y no toca el checkpoint
+    state = load_checkpoint(args.checkpoint, filter_signature(args), args.reset or args.dry_run)
+    if state["done"]:
+        print("✅ Checkpoint ya completo (usar --reset para empezar de nuevo)")
+        return 0
+
+    started, baseline = time.monotonic(), dict(state)
+    run_calls = 0
+    pool = ThreadPoolExecutor(max_workers=args.concurrency)
+    try:
+        for page in iter_pages(db, args, state["cursor"]):
+            pending, last_done, budget_hit = [], None, False
+            for doc in page:
+                candidate = is_candidate(doc.to_dict(), args)
+                if candidate and not args.dry_run:
+                    if run_calls >= args.max_calls:
+                        budget_hit = True
+                        break
+                    text, title = load_text(archive, doc, args)
+                    if len(text) < 200:
+                        state["no_text"] += 1
+                    else:
+                        run_calls += 1
+                        state["calls"] += 1
+                        pending.append((doc, pool.submit(reanalyze, doc, text, title)))
+                state["selected"] += int(candidate)
+                state["scanned"] += 1
+                last_done = doc.id
+
+            results = []
+            try:
+                for doc, fut in pending:
+                    try:
+                        _, update = fut.result()
+                    except Exception as e:
+                        # un doc malo no tira la página: las demás llamadas ya se pagaron
+                        print(f"⚠️ {doc.id}: {type(e).__name__}: {e}", file=sys.stderr)
+                        update = None
+                    if update is None:
+                        state["failed"] += 1
+                    else:
+                        results.append((doc, update))
+                state["analyzed"] += len(pending)
+            finally:
+                # también ante Ctrl+C: lo ya analizado se escribe antes de salir
+                if results:
+                    written = write_results(db, results)
+                    state["written"] += written
+                    state["deleted"] += len(results) - written
+
+            # el cursor avanza solo hasta el último doc procesado y ya escrito
+            if last_done:
+                state["cursor"] = last_done
+            if not args.dry_run:
+                save_checkpoint(args.checkpoint, state)
+            report(state, started, baseline, prefix="· ")
+
+            if budget_hit:
+                print(f"⏸️ Presupuesto de {args.max_calls} llamadas agotado; reanudar con el mismo comando")
+                return 0
+        if not args.dry_run:
+            state["done"] = True
+            save_checkpoint(args.checkpoint, state)
+    except KeyboardInterrupt:
+        print("\n⏸️ Interrumpido; el checkpoint quedó en la última página escrita")
+        return 130
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+    report(state, started, baseline, prefix="✅ ")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only-errors", action="store_true", help=f"solo resumen == '{app.RESUMEN_ERROR_IA}' o análisis sin API key")
+    parser.add_argument("--stale-prompt", action="store_true",
+                        help=f"solo analysis.prompt_version != {app.PROMPT_VERSION}")
+    parser.add_argument("--since", help="published_at >= fecha ISO (ej. 2025-01-01)")
+    parser.add_argument("--until", help="published_at < fecha ISO")
+    parser.add_argument("--page-size", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--max-calls", type=int, default=app.MAX_IA_CALLS_PER_RUN * 10,
+                        help="presupuesto de llamadas a Gemini en esta corrida")
+    parser.add_argument("--fetch-missing", action="store_true",
+                        help="si el texto no está en el archivo local, descargarlo")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT)
+    parser.add_argument("--reset", action="store_true")
+    parser.add_argument("--dry-run", action="store_true", help="solo cuenta candidatos, no llama a Gemini")
+    args = parser.parse_args(argv)
+
+    if not (args.only_errors or args.stale_prompt or args.since or args.until):
+        parser.error("indicar al menos un filtro (--only-errors, --stale-prompt, --since, --until)")
+    return run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
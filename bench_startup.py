@@ -0,0 +1,135 @@
+"""
+Benchmark de arranque en frío de app.py (presupuesto de import-time + regresión).
+
+Lanza un intérprete limpio con `python -X importtime -c "import app"`, suma el
+tiempo acumulado de los imports de primer nivel y verifica dos cosas:
+
+- el total queda bajo el presupuesto (--budget-ms / STARTUP_BUDGET_MS)
+- ningún módulo pesado (scan, gráficos, IA, Firestore) se carga antes del login
+
+Uso:
+    python bench_startup.py                 # reporte + check (exit 1 si hay regresión)
+    python bench_startup.py --runs 5 --top 15
+    python bench_startup.py --budget-ms 1200 --report bench_output.txt
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+DEFAULT_BUDGET_MS = 1500
+
+# Módulos que NO deben estar en sys.modules tras importar app (pantalla de login).
+HEAVY_MODULES = [
+    "firebase_admin",
+    "google.cloud.firestore",
+    "google.generativeai",
+    "duckduckgo_search",
+    "feedparser",
+    "trafilatura",
+    "pandas",
+    "plotly",
+    "smtplib",
+]
+
+PROBE = (
+    "import sys, json, app; "
+    f"print(json.dumps(sorted(m for m in {HEAVY_MODULES!r} if m in sys.modules)))"
+)
+
+
+def parse_importtime(stderr: str):
+    """
+    Parsea la salida de -X importtime.
+    Devuelve (total_us, hijos_de_app) donde total_us suma los imports de primer nivel
+    y hijos_de_app = [(cumulative_us, modulo), ...] son los imports directos de app.py.
+    """
+    total_us = 0
+    pending_children, app_children = [], []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        parts = line.split("|")
+        if len(parts) != 3:
+            continue
+        _, cumulative_us, name = parts
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        cumulative_us = int(cumulative_us.strip())
+        name = name.strip()
+
+        # importtime imprime los hijos antes que el padre
+        if depth == 1:
+            pending_children.append((cumulative_us, name))
+        elif depth == 0:
+            total_us += cumulative_us
+            if name == "app":
+                app_children = pending_children
+            pending_children = []
+    return total_us, app_children
+
+
+def run_once(cwd: str):
+    env = dict(os.environ)
+    env.pop("PYTHONPROFILEIMPORTTIME", None)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE],
+        cwd=cwd,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import app falló:\n{proc.stderr[-2000:]}")
+
+    total_us, app_children = parse_importtime(proc.stderr)
+    loaded_heavy = json.loads(proc.stdout.strip().splitlines()[-1] or "[]")
+    return total_us, app_children, loaded_heavy
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="corridas en frío (se reporta la mediana)")
+    parser.add_argument("--top", type=int, default=10, help="imports más caros a listar")
+    parser.add_argument("--budget-ms", type=float,
+                        default=float(os.environ.get("STARTUP_BUDGET_MS", DEFAULT_BUDGET_MS)))
+    parser.add_argument("--report", help="escribe también el reporte en este archivo")
+    args = parser.parse_args(argv)
+
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    totals, last_top, loaded_heavy = [], [], []
+    for _ in range(max(1, args.runs)):
+        total_us, last_top, loaded_heavy = run_once(cwd)
+        totals.append(total_us)
+
+    median_ms = statistics.median(totals) / 1000
+    lines = [
+        f"import app — mediana {median_ms:.1f} ms en {len(totals)} corridas "
+        f"(min {min(totals) / 1000:.1f} / max {max(totals) / 1000:.1f})",
+        f"presupuesto: {args.budget_ms:.0f} ms",
+        "",
+        f"top {args.top} imports directos de app.py (acumulado):",
+    ]
+    for us, name in sorted(last_top, reverse=True)[:args.top]:
+        lines.append(f"  {us / 1000:8.1f} ms  {name}")
+
+    failures = []
+    if median_ms > args.budget_ms:
+        failures.append(f"import-time {median_ms:.1f} ms > presupuesto {args.budget_ms:.0f} ms")
+    if loaded_heavy:
+        failures.append(f"módulos pesados cargados al importar app: {', '.join(loaded_heavy)}")
+
+    lines.append("")
+    lines.extend([f"❌ {f}" for f in failures] or ["✅ dentro de presupuesto, sin imports pesados en el arranque"])
+    report = "\n".join(lines)
+
+    print(report)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as fh:
+            fh.write(report + "\n")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,309 @@
+"""
+Load test del dashboard contra el emulador de Firestore.
+
+Siembra `news_articles` con un corpus sintético (departamentos, fechas, scores)
+y simula N sesiones concurrentes de main_app: query del feed, selección de
+noticias y vista de métricas. Reporta percentiles de latencia por camino,
+lecturas de Firestore por sesión-minuto y throughput.
+
+Modos:
+- baseline: comportamiento previo a fragments/caché, cada interacción
+  (incluido marcar un checkbox) re-ejecuta la query del feed
+- cached:   como corre hoy main_app, query vía consultar_noticias (caché TTL),
+  la selección es un fragment (sin query) y métricas usa la lista ya cargada
+
+En ambos modos la selección ejecuta app.marcar_seleccion sobre un
+session_state por hilo (ThreadSessionState), como el callback del checkbox.
+
+Uso:
+    gcloud emulators firestore start --host-port=localhost:8080
+    export FIRESTORE_EMULATOR_HOST=localhost:8080
+    python loadtest.py --seed 30000                       # siembra + corre (cached)
+    python loadtest.py --no-seed --mode baseline --sessions 50 --json base.json
+    python loadtest.py --no-seed --mode cached --sessions 50 --compare base.json
+"""
+import argparse
+import datetime
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from collections import defaultdict
+from collections.abc import MutableMapping
+from concurrent.futures import ThreadPoolExecutor
+
+import app
+
+FILTROS_TIEMPO = ["Hoy (Tiempo Real)", "Ayer", "Histórico 7 días"]
+SOURCES = ["TechCrunch", "TheVerge", "Wired_AI", "GoogleResearch_Atom", "arXiv_csAI", "Web Abierta"]
+PATHS = ["feed", "selection", "metrics"]
+# peso relativo de cada interacción en una sesión típica
+PATH_WEIGHTS = {"feed": 3, "selection": 5, "metrics": 1}
+SEED_BATCH = 500
+
+
+class Stats:
+    """
+    Latencias por camino + lecturas de Firestore, thread-safe.
+    """
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.reads = 0
+        self.queries = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def add_latency(self, path: str, seconds: float):
+        with self._lock:
+            self.latencies[path].append(seconds)
+
+    def add_reads(self, docs: int):
+        with self._lock:
+            self.queries += 1
+            # Firestore cobra al menos 1 lectura por query aunque no devuelva docs
+            self.reads += max(1, docs)
+
+    def add_error(self):
+        with self._lock:
+            self.errors += 1
+
+
+class ThreadSessionState(MutableMapping):
+    """
+    Reemplazo de st.session_state fuera del runtime de Streamlit: un dict por
+    hilo, así cada sesión simulada tiene su propia selección.
+    """
+    def __init__(self):
+        self._local = threading.local()
+
+    @property
+    def _state(self) -> dict:
+        if not hasattr(self._local, "state"):
+            self._local.state = {}
+        return self._local.state
+
+    def __getitem__(self, key):
+        return self._state[key]
+
+    def __setitem__(self, key, value):
+        self._state[key] = value
+
+    def __delitem__(self, key):
+        del self._state[key]
+
+    def __iter__(self):
+        return iter(self._state)
+
+    def __len__(self):
+        return len(self._state)
+
+
+def percentile(values, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(q / 100 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+def get_client(project: str):
+    if not os.environ.get("FIRESTORE_EMULATOR_HOST"):
+        print("❌ FIRESTORE_EMULATOR_HOST no definido: este script solo corre contra el emulador",
+              file=sys.stderr)
+        sys.exit(2)
+    from google.cloud import firestore
+
+    return firestore.Client(project=project)
+
+
+def seed_corpus(db, n_articles: int, days: int, rng: random.Random):
+    """
+    Corpus sintético con doc ids determinísticos (re-sembrar es idempotente).
+    Las fechas se concentran en los días recientes, como en uso real.
+    """
+    now = datetime.datetime.now()
+    batch, ops = db.batch(), 0
+    started = time.monotonic()
+    for i in range(n_articles):
+        url = f"https://loadtest.example/{i}"
+        dept = rng.choice(app.LISTA_DEPARTAMENTOS)
+        age_hours = min(days * 24, rng.expovariate(1 / (days * 24 / 4)))
+        batch.set(db.collection("news_articles").document(app.sha1(url)), {
+            "title": f"Artículo sintético {i} sobre {dept}",
+            "url": url,
+            "published_at": now - datetime.timedelta(hours=age_hours),
+            "source": rng.choice(SOURCES),
+            "analysis": {
+                "departamento": dept,
+                "resumen_ejecutivo": "Resumen sintético " * 6,
+                "accion_sugerida": "Revisar",
+                "relevancia_score": rng.randint(20, 99),
+                "topics": rng.sample(app.TOPICS_MVP, k=rng.randint(0, 3)),
+                "confidence": round(rng.random(), 2),
+                "prompt_version": app.PROMPT_VERSION,
+            },
+        })
+        ops += 1
+        if ops == SEED_BATCH:
+            batch.commit()
+            batch, ops = db.batch(), 0
+    if ops:
+        batch.commit()
+    print(f"🌱 {n_articles} artículos sembrados en {time.monotonic() - started:.1f}s")
+
+
+def run_session(db, args, stats: Stats, session_id: int, deadline: float):
+    rng = random.Random(args.rng_seed + session_id)
+    intereses = tuple(rng.sample(app.LISTA_DEPARTAMENTOS, k=rng.randint(1, 3)))
+    filtro = rng.choice(FILTROS_TIEMPO)
+    lista = []
+    choices = [p for p in PATHS for _ in range(PATH_WEIGHTS[p])]
+    app.st.session_state["selected_news"] = set()
+
+    def query():
+        if args.mode == "cached":
+            return app.consultar_noticias(db, intereses, filtro)
+        return app.consultar_noticias_firestore(db, intereses, filtro)
+
+    while time.monotonic() < deadline:
+        path = "feed" if not lista else rng.choice(choices)
+        started = time.perf_counter()
+        try:
+            if path == "feed":
+                # cambio de filtros = rerun completo con query nueva
+                if rng.random() < 0.2:
+                    filtro = rng.choice(FILTROS_TIEMPO)
+                lista = query()
+            elif path == "selection":
+                if args.mode == "baseline":
+                    lista = query()  # el checkbox re-ejecutaba todo el script
+                if lista:
+                    # el callback del checkbox de la tarjeta
+                    doc_id = rng.choice(lista)["id"]
+                    app.marcar_seleccion(doc_id, doc_id not in app.st.session_state["selected_news"])
+            elif path == "metrics":
+                if args.mode == "baseline":
+                    lista = query()
+                df = app.construir_df_metricas(lista)
+                if df is not None:
+                    df.groupby("departamento")["relevancia_score"].mean()
+            stats.add_latency(path, time.perf_counter() - started)
+        except Exception:
+            stats.add_error()
+        time.sleep(rng.uniform(0.5, 1.5) * args.think_ms / 1000)
+
+
+def instrument_reads(stats: Stats):
+    """
+    Cuenta las lecturas reales: envuelve la query sin caché que usa también
+    consultar_noticias, así los cache hits no suman lecturas.
+    """
+    original = app.consultar_noticias_firestore
+
+    def counted(*a, **kw):
+        result = original(*a, **kw)
+        stats.add_reads(len(result))
+        return result
+
+    app.consultar_noticias_firestore = counted
+
+
+def summarize(args, stats: Stats, elapsed: float) -> dict:
+    interactions = sum(len(v) for v in stats.latencies.values())
+    session_minutes = args.sessions * elapsed / 60
+    result = {
+        "mode": args.mode,
+        "sessions": args.sessions,
+        "duration_s": round(elapsed, 1),
+        "interactions": interactions,
+        "throughput_per_s": round(interactions / elapsed, 2),
+        "queries": stats.queries,
+        "reads": stats.reads,
+        "reads_per_session_minute": round(stats.reads / session_minutes, 1) if session_minutes else 0.0,
+        "errors": stats.errors,
+        "latency_ms": {},
+    }
+    for path in PATHS:
+        values = [v * 1000 for v in stats.latencies.get(path, [])]
+        result["latency_ms"][path] = {
+            "n": len(values),
+            "p50": round(percentile(values, 50), 1),
+            "p95": round(percentile(values, 95), 1),
+            "p99": round(percentile(values, 99), 1),
+            "max": round(max(values), 1) if values else 0.0,
+            "mean": round(statistics.fmean(values), 1) if values else 0.0,
+        }
+    return result
+
+
+def print_report(result: dict, baseline: dict = None):
+    print(f"\nModo {result['mode']} — {result['sessions']} sesiones, {result['duration_s']}s")
+    print(f"  interacciones: {result['interactions']} ({result['throughput_per_s']}/s), errores: {result['errors']}")
+    print(f"  lecturas: {result['reads']} en {result['queries']} queries "
+          f"→ {result['reads_per_session_minute']} por sesión-minuto")
+    print(f"  {'camino':<10} {'n':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}  (ms)")
+    for path, lat in result["latency_ms"].items():
+        print(f"  {path:<10} {lat['n']:>6} {lat['p50']:>8} {lat['p95']:>8} {lat['p99']:>8} {lat['max']:>8}")
+
+    if baseline:
+        def delta(new, old):
+            return f"{(new - old) / old * 100:+.0f}%" if old else "n/a"
+
+        print(f"\n  vs {baseline['mode']}:")
+        print(f"  lecturas/sesión-min {delta(result['reads_per_session_minute'], baseline['reads_per_session_minute'])}, "
+              f"throughput {delta(result['throughput_per_s'], baseline['throughput_per_s'])}")
+        for path in PATHS:
+            new, old = result["latency_ms"][path], baseline["latency_ms"].get(path, {})
+            print(f"  {path:<10} p50 {delta(new['p50'], old.get('p50', 0))}, p95 {delta(new['p95'], old.get('p95', 0))}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--project", default="amc-loadtest")
+    parser.add_argument("--seed", type=int, default=20000, help="artículos a sembrar")
+    parser.add_argument("--seed-days", type=int, default=30, help="rango de fechas del corpus")
+    parser.add_argument("--no-seed", action="store_true", help="usar el corpus ya sembrado")
+    parser.add_argument("--mode", choices=["baseline", "cached"], default="cached")
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=60, help="segundos de carga")
+    parser.add_argument("--think-ms", type=float, default=1500, help="pausa media entre interacciones")
+    parser.add_argument("--rng-seed", type=int, default=7)
+    parser.add_argument("--json", help="guardar el resultado (para --compare en otra corrida)")
+    parser.add_argument("--compare", help="resultado JSON de referencia")
+    args = parser.parse_args(argv)
+
+    db = get_client(args.project)
+    if not args.no_seed:
+        seed_corpus(db, args.seed, args.seed_days, random.Random(args.rng_seed))
+
+    stats = Stats()
+    instrument_reads(stats)
+    app.st.session_state = ThreadSessionState()
+
+    print(f"🚦 {args.sessions} sesiones ({args.mode}) durante {args.duration:.0f}s...")
+    started = time.monotonic()
+    deadline = started + args.duration
+    with ThreadPoolExecutor(max_workers=args.sessions) as pool:
+        futures = [pool.submit(run_session, db, args, stats, i, deadline) for i in range(args.sessions)]
+        for fut in futures:
+            fut.result()  # propaga errores fuera del loop de interacciones
+    elapsed = time.monotonic() - started
+
+    result = summarize(args, stats, elapsed)
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fh:
+            baseline = json.load(fh)
+    print_report(result, baseline)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(result, fh, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,244 @@
+"""
+Retención de `news_articles`: compacta, exporta y borra artículos viejos.
+
+Para los artículos con published_at anterior al horizonte (--horizon-days,
+por defecto RETENTION_DAYS de app.py):
+
+1. exporta el documento completo a un archivo local comprimido
+   (`retention_exports/<día>/part-<doc_id>.jsonl.gz` o `.parquet`)
+2. agrega un resumen por día en `news_daily_summaries/<YYYY-MM-DD>/parts/<n>`
+   (doc_id, title, url, departamento, score, cluster), repartido en
+   SUMMARY_SHARDS docs por hash del doc_id para no pasar el 1 MiB por documento
+3. borra los originales en batches
+
+Cada página se procesa en ese orden, así que un corte a mitad de camino no
+pierde datos: al re-ejecutar, los docs que quedaron se vuelven a exportar
+(mismo nombre de archivo) y el resumen es un map por doc_id (idempotente).
+
+Uso:
+    python retention.py --dry-run                 # cuánto se liberaría
+    python retention.py --horizon-days 30
+    python retention.py --format parquet --export-dir /backups/news
+"""
+import argparse
+import datetime
+import gzip
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+
+import app
+
+SUMMARY_COLLECTION = "news_daily_summaries"
+SUMMARY_SHARDS = 16                    # ~300 B por entrada: holgado para miles de artículos/día
+DEFAULT_EXPORT_DIR = "retention_exports"
+FIRESTORE_BATCH_LIMIT = 500
+
+
+def to_jsonable(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return str(value)
+
+
+def day_key(published_at) -> str:
+    if isinstance(published_at, datetime.datetime):
+        return published_at.date().isoformat()
+    return "sin-fecha"
+
+
+def summary_entry(doc_id: str, data: dict) -> dict:
+    """
+    Lo que sobrevive en el resumen diario. `cluster`: primer topic del análisis
+    (la app no agrupa artículos), o el departamento si no hay topics.
+    """
+    analysis = data.get("analysis", {}) or {}
+    topics = analysis.get("topics") or []
+    departamento = analysis.get("departamento", "General")
+    return {
+        "doc_id": doc_id,
+        "title": data.get("title", ""),
+        "url": data.get("url", ""),
+        "departamento": departamento,
+        "score": analysis.get("relevancia_score", 0),
+        "cluster": topics[0] if topics else departamento,
+    }
+
+
+def estimate_doc_bytes(doc_id: str, data: dict) -> int:
+    # aproximación del tamaño almacenado: nombre + JSON de los campos
+    return len(doc_id) + len(json.dumps(data, default=to_jsonable, ensure_ascii=False).encode("utf-8"))
+
+
+def export_page(export_dir: str, fmt: str, by_day: dict) -> int:
+    """
+    Un archivo por (día, página), nombrado por el primer doc id: re-ejecutar
+    una página interrumpida sobrescribe el mismo archivo.
+    """
+    written = 0
+    for day, docs in by_day.items():
+        day_dir = os.path.join(export_dir, day)
+        os.makedirs(day_dir, exist_ok=True)
+        rows = [{"id": doc_id, **data} for doc_id, data in docs]
+        if fmt == "parquet":
+            import pandas as pd
+
+            path = os.path.join(day_dir, f"part-{docs[0][0]}.parquet")
+            records = [json.loads(json.dumps(r, default=to_jsonable)) for r in rows]
+            pd.json_normalize(records).to_parquet(path, index=False)
+        else:
+            path = os.path.join(day_dir, f"part-{docs[0][0]}.jsonl.gz")
+            with gzip.open(path, "wt", encoding="utf-8") as fh:
+                for r in rows:
+                    fh.write(json.dumps(r, default=to_jsonable, ensure_ascii=False) + "\n")
+        written += os.path.getsize(path)
+    return written
+
+
+def summary_shard(doc_id: str) -> int:
+    # estable entre corridas (hash() de Python cambia por proceso)
+    return int(app.sha1(doc_id)[:8], 16) % SUMMARY_SHARDS
+
+
+def write_summaries(db, by_day: dict):
+    """
+    `<día>` guarda la fecha y la cantidad de shards; cada `<día>/parts/<n>` un
+    map `articles.<doc_id>` con merge=True, así re-escribir un doc lo reemplaza.
+    """
+    now = datetime.datetime.now()
+    batch, ops = db.batch(), 0
+    for day, docs in by_day.items():
+        day_ref = db.collection(SUMMARY_COLLECTION).document(day)
+        shards = defaultdict(dict)
+        for doc_id, data in docs:
+            shards[summary_shard(doc_id)][doc_id] = summary_entry(doc_id, data)
+
+        writes = [(day_ref, {"date": day, "shards": SUMMARY_SHARDS, "updated_at": now})]
+        for n, articles in shards.items():
+            writes.append((day_ref.collection("parts").document(str(n)),
+                           {"articles": articles, "updated_at": now}))
+        for ref, payload in writes:
+            batch.set(ref, payload, merge=True)
+            ops += 1
+            if ops == FIRESTORE_BATCH_LIMIT:
+                batch.commit()
+                batch, ops = db.batch(), 0
+    if ops:
+        batch.commit()
+
+
+def delete_docs(db, doc_ids):
+    batch, ops = db.batch(), 0
+    for doc_id in doc_ids:
+        batch.delete(db.collection("news_articles").document(doc_id))
+        ops += 1
+        if ops == FIRESTORE_BATCH_LIMIT:
+            batch.commit()
+            batch, ops = db.batch(), 0
+    if ops:
+        batch.commit()
+
+
+def iter_old_pages(db, cutoff: datetime.datetime, page_size: int, advance_cursor: bool):
+    """
+    Páginas de docs con published_at < cutoff, del más viejo al más nuevo.
+    Si los docs se borran después de cada página, la query siempre arranca
+    desde el principio; en dry-run se avanza con start_after.
+    """
+    from google.cloud.firestore_v1.base_query import FieldFilter
+
+    def base():
+        return (db.collection("news_articles")
+                .where(filter=FieldFilter("published_at", "<", cutoff))
+                .order_by("published_at"))
+
+    query = base()
+    while True:
+        page = list(query.limit(page_size).stream())
+        if not page:
+            return
+        yield page
+        query = base().start_after(page[-1]) if advance_cursor else base()
+
+
+def human_bytes(n: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024:
+            return f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} TB"
+
+
+def run(args) -> int:
+    db = app.init_connection()
+    if db is None:
+        print("❌ Sin conexión a Firestore", file=sys.stderr)
+        return 1
+
+    hoy = datetime.datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    cutoff = hoy - datetime.timedelta(days=args.horizon_days)
+    print(f"Horizonte: {args.horizon_days} días (published_at < {cutoff:%Y-%m-%d})"
+          f"{' — DRY RUN' if args.dry_run else ''}")
+
+    started = time.monotonic()
+    docs_total, bytes_total, exported_bytes = 0, 0, 0
+    days = defaultdict(int)
+    try:
+        for page in iter_old_pages(db, cutoff, args.page_size, advance_cursor=args.dry_run):
+            if args.max_docs is not None:
+                page = page[:max(0, args.max_docs - docs_total)]
+                if not page:
+                    break
+
+            by_day = defaultdict(list)
+            for snap in page:
+                data = snap.to_dict()
+                by_day[day_key(data.get("published_at"))].append((snap.id, data))
+                bytes_total += estimate_doc_bytes(snap.id, data)
+            for day, docs in by_day.items():
+                days[day] += len(docs)
+            docs_total += len(page)
+
+            if not args.dry_run:
+                exported_bytes += export_page(args.export_dir, args.format, by_day)
+                write_summaries(db, by_day)
+                delete_docs(db, [snap.id for snap in page])
+
+            print(f"· {docs_total} docs, {len(days)} días, ~{human_bytes(bytes_total)}")
+    except KeyboardInterrupt:
+        print("\n⏸️ Interrumpido; las páginas completas ya quedaron exportadas y borradas")
+        return 130
+
+    elapsed = max(time.monotonic() - started, 1e-6)
+    verbo = "se liberarían" if args.dry_run else "liberados"
+    print(f"{'🔎' if args.dry_run else '✅'} {docs_total} artículos en {len(days)} días; "
+          f"~{human_bytes(bytes_total)} {verbo} en news_articles ({docs_total / elapsed:.1f} docs/s)")
+    if not args.dry_run:
+        print(f"   export: {human_bytes(exported_bytes)} en {args.export_dir}/ ({args.format}); "
+              f"resúmenes en {SUMMARY_COLLECTION}/")
+    for day in sorted(days)[:args.show_days]:
+        print(f"   {day}: {days[day]}")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--horizon-days", type=int, default=app.RETENTION_DAYS)
+    parser.add_argument("--export-dir", default=DEFAULT_EXPORT_DIR)
+    parser.add_argument("--format", choices=["jsonl", "parquet"], default="jsonl")
+    parser.add_argument("--page-size", type=int, default=FIRESTORE_BATCH_LIMIT)
+    parser.add_argument("--max-docs", type=int, help="tope de artículos a procesar en esta corrida")
+    parser.add_argument("--show-days", type=int, default=10, help="días a listar en el reporte")
+    parser.add_argument("--dry-run", action="store_true", help="solo reporta; no exporta ni borra")
+    args = parser.parse_args(argv)
+
+    if args.horizon_days < 7:
+        # el dashboard lee hasta 7 días (Histórico 7 días)
+        parser.error("--horizon-days debe ser >= 7")
+    return run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())